@@ -0,0 +1,226 @@
+import time
+import urllib.parse
+from collections import OrderedDict
+
+def trade_value(trade):
+    """USDC value of a trade, from usdcSize or price * size"""
+    usdc_size = float(trade.get("usdcSize", 0))
+    if usdc_size > 0:
+        return usdc_size
+    return float(trade.get("price", 0)) * float(trade.get("size", 0))
+
+def parse_timestamp(value):
+    """Unix time in seconds from a seconds or milliseconds value, None if missing or malformed"""
+    try:
+        timestamp = float(value or 0)
+    except (TypeError, ValueError):
+        return None
+    if timestamp <= 0:
+        return None
+    return timestamp / 1000 if timestamp > 1e12 else timestamp
+
+def trade_timestamp(trade):
+    """Unix time of a trade in seconds (the feed may send ms), None if missing or malformed"""
+    return parse_timestamp(trade.get("timestamp"))
+
+def market_link(trade, market=None):
+    """Markdown link to a trade's market, falling back to cached metadata, then a search URL"""
+    title = trade.get("title", "Unknown Market")
+    event_slug = trade.get("eventSlug", "") or (market or {}).get("event_slug", "")
+    market_slug = (market or {}).get("slug", "")
+    if event_slug:
+        market_url = f"https://polymarket.com/event/{event_slug}"
+    elif market_slug:
+        market_url = f"https://polymarket.com/market/{market_slug}"
+    else:
+        search_query = urllib.parse.quote(title[:50])
+        market_url = f"https://polymarket.com/search?q={search_query}"
+    return f"[{title[:80]}]({market_url})"
+
+def wallet_display(wallet, wallet_name=None):
+    """Bold display name, or a shortened code-formatted address"""
+    return f"*{wallet_name}*" if wallet_name else f"`{wallet[:10]}...{wallet[-8:]}`"
+
+def market_context(trade, market):
+    """Current price, volume and end date lines from cached market metadata"""
+    lines = ""
+    current = market["prices"].get(str(trade.get("outcome", "")).lower())
+    price = float(trade.get("price", 0))
+    if current is not None:
+        move = f" ({(current - price) / price * 100:+.1f}% since trade)" if price > 0 else ""
+        lines += f"📈 *Now:* ${current:.4f}{move}\n"
+    details = []
+    if market.get("volume"):
+        details.append(f"${market['volume']:,.0f} volume")
+    if market.get("end_date"):
+        details.append(f"ends {market['end_date']}")
+    if details:
+        lines += f"🗓 *Stats:* {' · '.join(details)}\n"
+    return lines
+
+def format_trade_message(trade, wallet_name=None, market=None):
+    """
+    Format trade data for Telegram
+    
+    Args:
+        trade: Trade dict from the feed
+        wallet_name: Display name for the wallet, shortened address when None
+        market: Cached market metadata from MarketCache, None when not fetched yet
+    """
+    side = trade.get("side", "").upper()
+    action = "🟢 BUY" if side == "BUY" else "🔴 SELL"
+    
+    price = float(trade.get("price", 0))
+    size = float(trade.get("size", 0))
+    total_value = trade_value(trade)
+    
+    outcome = trade.get("outcome", "Unknown")
+    tx_hash = trade.get("transactionHash", "Unknown")
+    wallet = trade.get("proxyWallet", "Unknown")
+    
+    message = f"""
+🔥 *NEW TRADE DETECTED!* 🔥
+
+⚡ *Action:* {action}
+📊 *Market:* {market_link(trade, market)}
+🎯 *Outcome:* {outcome}
+💰 *Size:* {size:.2f} shares
+💵 *Price:* ${price:.4f}
+💸 *Total:* ${total_value:.2f}
+{market_context(trade, market) if market else ""}
+👤 *Wallet:* {wallet_display(wallet, wallet_name)}
+🔗 [View Transaction](https://polygonscan.com/tx/{tx_hash})
+
+💡 *To copy:* Click market link above → {side} "{outcome}"
+"""
+    return message
+
+def format_digest_message(groups, window, name_lookup, max_groups=15):
+    """
+    Format a batch of aggregated trades for Telegram
+    
+    Args:
+        groups: TradeGroup objects, one per wallet/market/outcome/side
+        window: Batching window in seconds
+        name_lookup: Function mapping a wallet address to its display name or None
+        max_groups: Most groups listed individually
+    """
+    fills = sum(group.count for group in groups)
+    total = sum(group.value for group in groups)
+    
+    message = f"\n📦 *TRADE DIGEST* ({fills} trades in {window:g}s, ${total:,.2f})\n"
+    
+    # Largest groups first, capped to stay inside Telegram's message size
+    shown = sorted(groups, key=lambda g: -g.value)[:max_groups]
+    
+    current_wallet = None
+    for group in sorted(shown, key=lambda g: (g.wallet, -g.value)):
+        if group.wallet != current_wallet:
+            current_wallet = group.wallet
+            message += f"\n👤 {wallet_display(group.wallet, name_lookup(group.wallet))}\n"
+        
+        action = "🟢 BUY" if group.side == "BUY" else "🔴 SELL"
+        message += (
+            f"{action} \"{group.outcome}\" · {market_link(group.trade)}\n"
+            f"   {group.count} fill(s) · {group.size:,.2f} shares @ ${group.vwap:.4f} VWAP · ${group.value:,.2f}\n"
+        )
+    
+    if len(groups) > len(shown):
+        message += f"\n➕ {len(groups) - len(shown)} smaller position(s) not shown\n"
+    
+    return message
+
+def format_stored_trade(row, name_lookup=None):
+    """
+    Two-line summary of a trade row from TradeStore
+    
+    Args:
+        row: Row dict from TradeStore.history or TradeStore.top
+        name_lookup: Function mapping a wallet to its display name; the wallet is shown only when given
+    """
+    action = "🟢 BUY" if row["side"] == "BUY" else "🔴 SELL"
+    who = f"{wallet_display(row['wallet'], name_lookup(row['wallet']))} " if name_lookup else ""
+    when = time.strftime("%m-%d %H:%M", time.gmtime(row["ts"]))
+    return (
+        f"{who}{action} \"{row['outcome']}\" · {market_link({'title': row['title'], 'eventSlug': row['event_slug']})}\n"
+        f"   {row['size']:,.2f} shares @ ${row['price']:.4f} · ${row['value']:,.2f} · {when} UTC\n"
+    )
+
+def format_consensus_message(signal, name_lookup, max_wallets=10):
+    """
+    Format a consensus signal for Telegram
+    
+    Args:
+        signal: Signal dict from ConsensusDetector.observe
+        name_lookup: Function mapping a wallet address to its display name or None
+        max_wallets: Most wallets listed individually
+    """
+    trade = signal["trade"]
+    wallets = signal["wallets"]
+    action = "🟢 BUY" if signal["side"] == "BUY" else "🔴 SELL"
+    total = sum(value for _, value, _ in wallets)
+    avg_price = sum(value * price for _, value, price in wallets) / total if total else 0.0
+    
+    message = f"""
+🚨 *CONSENSUS SIGNAL* 🚨
+
+{action} "{signal['outcome']}" · {market_link(trade)}
+👥 *{len(wallets)} tracked wallets* within {signal['minutes']:g} min:
+"""
+    for wallet, value, price in wallets[:max_wallets]:
+        message += f"• {wallet_display(wallet, name_lookup(wallet))} ${value:,.2f} @ ${price:.4f}\n"
+    if len(wallets) > max_wallets:
+        message += f"➕ {len(wallets) - max_wallets} more\n"
+    
+    message += f"""
+💸 *Total:* ${total:,.2f} · avg ${avg_price:.4f}
+
+💡 *To copy:* Click market link above → {signal['side']} "{signal['outcome']}"
+"""
+    return message
+
+class AlertRenderer:
+    """Formats each unique trade once and reuses the text for every chat"""
+    
+    def __init__(self, name_lookup, max_entries=1024, market_lookup=None):
+        """
+        Initialize renderer
+        
+        Args:
+            name_lookup: Function mapping a wallet address to its display name or None
+            max_entries: Rendered messages kept for reuse
+            market_lookup: Function mapping a condition ID to cached market metadata or None
+        """
+        self.name_lookup = name_lookup
+        self.max_entries = max_entries
+        self.market_lookup = market_lookup
+        
+        # {(trade ID, wallet, display name, has metadata): text}, least recently used first
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def render(self, trade):
+        """Rendered alert text for a trade"""
+        wallet = trade.get("proxyWallet", "").lower()
+        wallet_name = self.name_lookup(wallet)
+        market = self.market_lookup(trade.get("conditionId")) if self.market_lookup else None
+        trade_id = trade.get("transactionHash") or trade.get("id")
+        if not trade_id:
+            return format_trade_message(trade, wallet_name, market)
+        
+        # Re-render once metadata arrives instead of reusing the bare text;
+        # wallets filling in the same transaction each get their own text
+        key = (trade_id, wallet, wallet_name, market is not None)
+        message = self._cache.get(key)
+        if message is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return message
+        
+        self.misses += 1
+        message = format_trade_message(trade, wallet_name, market)
+        self._cache[key] = message
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return message
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from dispatcher import TokenBucket
+from http_session import open_session
+
+logger = logging.getLogger(__name__)
+
+class TradeBackfill:
+    """Recovers trades missed while the feed was down from Polymarket's data API"""
+    
+    def __init__(self, feed, base_url="https://data-api.polymarket.com", concurrency=8,
+                 rate=10, max_lookback=3600, page_size=500, max_pages=5, timeout=10.0):
+        """
+        Initialize backfill
+        
+        Args:
+            feed: PolymarketFeed whose wallets are backfilled and which dedups the results
+            base_url: Data API root, point at a local stand-in for testing
+            concurrency: Most requests in flight at once
+            rate: Most requests started per second
+            max_lookback: Never reach back further than this many seconds
+            page_size: Activity rows requested per page
+            max_pages: Most pages fetched per wallet and gap
+            timeout: Per-request timeout in seconds
+        """
+        self.feed = feed
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_lookback = max_lookback
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.timeout = timeout
+        
+        self.session = None
+        
+        self.recovered = 0
+        self.failures = 0
+        self._task = None
+        self._since = None
+    
+    def schedule(self, since):
+        """Start a backfill in the background, replacing one still running"""
+        if self._task is not None and not self._task.done():
+            # The unfinished run's gap started earlier, keep covering it
+            self._task.cancel()
+            if self._since is not None:
+                since = self._since if since is None else min(since, self._since)
+        
+        self._since = since
+        self._task = asyncio.get_running_loop().create_task(self.run(since))
+    
+    async def run(self, since):
+        """
+        Backfill every tracked wallet
+        
+        Args:
+            since: Unix time the feed was last known to be live
+        
+        Returns:
+            Number of trades that were new after dedup
+        """
+        wallets = list(self.feed.subscribers)
+        if not wallets or since is None:
+            return 0
+        
+        if self.session is None:
+            self.session = open_session(self.concurrency)
+        floor = max(since, time.time() - self.max_lookback)
+        slots = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate)
+        
+        results = await asyncio.gather(
+            *(self._backfill_wallet(wallet, floor, slots, bucket) for wallet in wallets),
+            return_exceptions=True,
+        )
+        
+        recovered = 0
+        for wallet, result in zip(wallets, results):
+            if isinstance(result, Exception):
+                self.failures += 1
+                logger.warning("⚠️ Backfill failed for %s...: %s", wallet[:10], result, extra={"wallet": wallet})
+            else:
+                recovered += result
+        
+        self.recovered += recovered
+        if recovered:
+            logger.info("🩹 Backfilled %d missed trade(s) across %d wallet(s)", recovered, len(wallets))
+        return recovered
+    
+    async def _backfill_wallet(self, wallet, floor, slots, bucket):
+        """Fetch one wallet's trades since the gap started and route them"""
+        # Trades after the last one we saw for this wallet, within the gap
+        start = max(floor, self.feed.last_trade_at.get(wallet, 0))
+        
+        recovered = 0
+        for page in range(self.max_pages):
+            async with slots:
+                await bucket.acquire()
+                trades = await asyncio.to_thread(self._fetch, wallet, start, page * self.page_size)
+            
+            recovered += self.feed.inject(trades)
+            if len(trades) < self.page_size:
+                break
+        return recovered
+    
+    def _fetch(self, wallet, start, offset):
+        """Blocking GET of one page of a wallet's trades, oldest first"""
+        response = self.session.get(
+            f"{self.base_url}/activity",
+            params={
+                "user": wallet,
+                "type": "TRADE",
+                "start": int(start),
+                "limit": self.page_size,
+                "offset": offset,
+                "sortBy": "TIMESTAMP",
+                "sortDirection": "ASC",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        trades = response.json()
+        return trades if isinstance(trades, list) else []
@@ -0,0 +1,113 @@
+import asyncio
+from alerts import format_digest_message, trade_value
+
+class TradeGroup:
+    """Running totals for one wallet/market/outcome/side within a window"""
+    
+    __slots__ = ("wallet", "side", "outcome", "trade", "count", "size", "notional", "value")
+    
+    def __init__(self, wallet, side, outcome, trade):
+        self.wallet = wallet
+        self.side = side
+        self.outcome = outcome
+        self.trade = trade
+        self.count = 0
+        self.size = 0.0
+        self.notional = 0.0
+        self.value = 0.0
+    
+    def add(self, trade):
+        """Fold a trade into the totals"""
+        size = float(trade.get("size", 0))
+        self.count += 1
+        self.size += size
+        self.notional += float(trade.get("price", 0)) * size
+        self.value += trade_value(trade)
+    
+    @property
+    def vwap(self):
+        """Size-weighted average price"""
+        return self.notional / self.size if self.size else 0.0
+
+class AlertBatcher:
+    """Coalesces a chat's trades over a window into one digest message"""
+    
+    def __init__(self, renderer, submit, name_lookup):
+        """
+        Initialize batcher
+        
+        Args:
+            renderer: AlertRenderer used when a window holds a single trade
+            submit: Function (chat_id, text) that queues a message for delivery
+            name_lookup: Function mapping a wallet address to its display name or None
+        """
+        self.renderer = renderer
+        self.submit = submit
+        self.name_lookup = name_lookup
+        
+        # Open windows {(chat_id, window): {group key: TradeGroup}}
+        self.buffers = {}
+        self._timers = {}
+        self._callbacks = {}
+    
+    def add(self, chat_id, window, trade, on_done=None):
+        """
+        Buffer a trade for a chat, opening a window if none is open
+        
+        Args:
+            chat_id: Telegram chat the digest goes to
+            window: Seconds to collect trades before sending
+            trade: Trade dict from the feed
+            on_done: Optional function called with True/False once the digest is sent
+        """
+        key = (chat_id, window)
+        groups = self.buffers.get(key)
+        if groups is None:
+            groups = self.buffers[key] = {}
+            self._timers[key] = asyncio.get_running_loop().call_later(window, self.flush, key)
+        
+        wallet = trade.get("proxyWallet", "").lower()
+        side = trade.get("side", "").upper()
+        outcome = trade.get("outcome", "Unknown")
+        market = trade.get("conditionId") or trade.get("title", "")
+        
+        group_key = (wallet, market, outcome, side)
+        group = groups.get(group_key)
+        if group is None:
+            group = groups[group_key] = TradeGroup(wallet, side, outcome, trade)
+        group.add(trade)
+        
+        if on_done is not None:
+            self._callbacks.setdefault(key, []).append(on_done)
+    
+    def flush(self, key):
+        """Send the digest for a window and close it"""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        
+        groups = self.buffers.pop(key, None)
+        callbacks = self._callbacks.pop(key, ())
+        if not groups:
+            return
+        
+        def on_done(ok):
+            for callback in callbacks:
+                callback(ok)
+        
+        chat_id, window = key
+        groups = list(groups.values())
+        if len(groups) == 1 and groups[0].count == 1:
+            # Nothing to coalesce, send the usual alert
+            self.submit(chat_id, self.renderer.render(groups[0].trade), on_done)
+        else:
+            self.submit(chat_id, format_digest_message(groups, window, self.name_lookup), on_done)
+    
+    def flush_all(self):
+        """Send every open window now"""
+        for key in list(self.buffers):
+            self.flush(key)
+    
+    def pending(self):
+        """Number of trades waiting in open windows"""
+        return sum(group.count for groups in self.buffers.values() for group in groups.values())
@@ -0,0 +1,312 @@
+"""Replayable benchmark for the trade ingest -> alert pipeline
+
+Replays a synthetic (or recorded) activity/trades firehose through the same
+components main.py wires together: PolymarketFeed -> on_trade -> AlertRenderer
+-> AlertDispatcher, with a local WebSocket server standing in for Polymarket and
+a fake bot recording send times in place of Telegram.
+
+Usage:
+    python bench.py                          # 1, 100 and 1000 wallets
+    python bench.py --wallets 100 --frames 50000
+    python bench.py --record frames.jsonl    # save the synthetic feed
+    python bench.py --replay frames.jsonl    # replay a saved/captured feed
+
+Each wallet count runs in a fresh subprocess so RSS figures don't bleed
+into each other.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import websockets
+
+from alerts import AlertRenderer, format_trade_message
+from config_store import ConfigStore
+from dispatcher import AlertDispatcher
+from polymarket_tracker import PolymarketFeed
+
+def make_wallets(count, rng):
+    """Random checksummed-looking wallet addresses"""
+    return ["0x" + "".join(rng.choice("0123456789abcdefABCDEF") for _ in range(40)) for _ in range(count)]
+
+def make_trade(wallet, n, rng):
+    """One activity/trades payload"""
+    price = round(rng.uniform(0.01, 0.99), 4)
+    size = round(rng.uniform(1, 5000), 2)
+    return {
+        "proxyWallet": wallet,
+        "side": rng.choice(("BUY", "SELL")),
+        "price": price,
+        "size": size,
+        "usdcSize": round(price * size, 6),
+        "title": f"Will market {n % 500} resolve yes?",
+        "outcome": rng.choice(("Yes", "No")),
+        "eventSlug": f"market-{n % 500}" if n % 7 else "",
+        "conditionId": f"0x{n % 500:064x}",
+        "transactionHash": f"0x{n:064x}",
+        "timestamp": int(time.time()),
+    }
+
+def make_frames(tracked, frame_count, trades_per_frame, match_ratio, seed):
+    """
+    Synthetic firehose frames
+    
+    Mixes the three shapes _on_message accepts (payload list, payload dict,
+    top-level trades) with pongs, and trades from wallets nobody tracks.
+    """
+    rng = random.Random(seed)
+    # Separate stream so strangers never collide with the tracked wallets
+    strangers = make_wallets(256, random.Random(f"strangers-{seed}"))
+    frames = []
+    n = 0
+    
+    for i in range(frame_count):
+        if i % 50 == 49:
+            frames.append(json.dumps({"type": "pong"}))
+            continue
+        
+        trades = []
+        for _ in range(trades_per_frame):
+            wallet = rng.choice(tracked) if rng.random() < match_ratio else rng.choice(strangers)
+            trades.append(make_trade(wallet, n, rng))
+            n += 1
+        
+        shape = i % 3
+        if shape == 0:
+            frame = {"topic": "activity", "type": "trades", "payload": trades}
+        elif shape == 1:
+            frame = {"topic": "activity", "type": "trades", "payload": trades[0]}
+        else:
+            frame = {"trades": trades}
+        frames.append(json.dumps(frame))
+    
+    return frames
+
+class FakeBot:
+    """Stands in for telegram.Bot, recording when each alert was sent"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append((time.perf_counter(), text))
+
+def rss_kb():
+    """Current resident set size in KiB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def build_pipeline(wallets, chats):
+    """Feed, store, renderer and dispatcher wired like main.py"""
+    store = ConfigStore(os.devnull)
+    for i, wallet in enumerate(wallets):
+        store.subscribe(chats[i % len(chats)], wallet.lower(), f"Wallet {i}" if i % 2 else None)
+    
+    renderer = AlertRenderer(store.name_for)
+    
+    # Telegram's limits would dominate every number, measure our own overhead
+    dispatcher = AlertDispatcher(max_concurrent=64, global_rate=1_000_000,
+                                 private_interval=0, group_interval=0)
+    
+    def on_trade(trade):
+        message = renderer.render(trade)
+        for chat_id in store.chats_for(trade.get("proxyWallet", "")):
+            dispatcher.submit(chat_id, message)
+    
+    feed = PolymarketFeed()
+    for wallet in store.wallets:
+        feed.subscribe(wallet, on_trade)
+    
+    return feed, renderer, dispatcher
+
+async def bench_decode(frames, wallets, chats):
+    """Frames/sec through _on_message with the full callback chain"""
+    feed, _, dispatcher = build_pipeline(wallets, chats)
+    bot = FakeBot()
+    dispatcher.start(bot)
+    
+    started = time.perf_counter()
+    for frame in frames:
+        feed._on_message(frame)
+    elapsed = time.perf_counter() - started
+    
+    dispatcher.stop()
+    return len(frames) / elapsed
+
+def bench_format(frames, iterations=20000):
+    """format_trade_message calls/sec"""
+    trades = []
+    for frame in frames:
+        data = json.loads(frame)
+        payload = data.get("payload", data.get("trades"))
+        if isinstance(payload, dict):
+            payload = [payload]
+        trades.extend(payload or [])
+        if len(trades) >= 1000:
+            break
+    
+    started = time.perf_counter()
+    for i in range(iterations):
+        format_trade_message(trades[i % len(trades)], "Wallet")
+    return iterations / (time.perf_counter() - started)
+
+async def bench_end_to_end(frames, wallets, chats, rate):
+    """Trade -> send latency through a local WebSocket stand-in"""
+    feed, _, dispatcher = build_pipeline(wallets, chats)
+    bot = FakeBot()
+    dispatcher.start(bot)
+    
+    # Work out which trades should alert before the clock starts
+    tracked = [(frame, _tracked_hashes(frame, feed.subscribers)) for frame in frames]
+    sent_at = {}
+    done = asyncio.Event()
+    
+    async def serve(ws):
+        await ws.recv()  # subscription
+        delay = 1 / rate if rate else 0
+        for i, (frame, hashes) in enumerate(tracked):
+            now = time.perf_counter()
+            for tx_hash in hashes:
+                sent_at[tx_hash] = now
+            await ws.send(frame)
+            if delay:
+                await asyncio.sleep(delay)
+            elif i % 100 == 0:
+                await asyncio.sleep(0)
+        done.set()
+        await ws.wait_closed()
+    
+    async with websockets.serve(serve, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        feed.ws_url = f"ws://127.0.0.1:{port}"
+        feed.start()
+        
+        await done.wait()
+        # Give the dispatcher a moment to drain
+        for _ in range(200):
+            if dispatcher.pending() == 0:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        feed.stop()
+    
+    dispatcher.stop()
+    
+    latencies = []
+    for sent, text in bot.sent:
+        tx_hash = text.rsplit("/tx/", 1)[1].split(")", 1)[0]
+        if tx_hash in sent_at:
+            latencies.append((sent - sent_at[tx_hash]) * 1000)
+    
+    return len(bot.sent), percentile(latencies, 50), percentile(latencies, 99)
+
+def _tracked_hashes(frame, subscribers):
+    """Transaction hashes of tracked-wallet trades in a frame (harness bookkeeping)"""
+    data = json.loads(frame)
+    payload = data.get("payload", data.get("trades"))
+    if isinstance(payload, dict):
+        payload = [payload]
+    return [t["transactionHash"] for t in payload or () if t["proxyWallet"].lower() in subscribers]
+
+def run_one(args, wallet_count):
+    """Benchmark one wallet count, returns a result dict"""
+    rng = random.Random(args.seed)
+    wallets = make_wallets(wallet_count, rng)
+    chats = [1000 + i for i in range(max(1, min(wallet_count // 10, 50)))]
+    
+    if args.replay:
+        with open(args.replay) as f:
+            frames = [line.rstrip("\n") for line in f if line.strip()]
+        # Track the wallets that actually trade in the capture
+        seen = []
+        for frame in frames:
+            data = json.loads(frame)
+            payload = data.get("payload", data.get("trades"))
+            if isinstance(payload, dict):
+                payload = [payload]
+            for trade in payload or ():
+                wallet = trade.get("proxyWallet", "")
+                if wallet and wallet not in seen:
+                    seen.append(wallet)
+        wallets = (seen + wallets)[:wallet_count]
+    else:
+        frames = make_frames(wallets, args.frames, args.trades_per_frame, args.match_ratio, args.seed)
+    
+    rss_before = rss_kb()
+    decode_rate = asyncio.run(bench_decode(frames, wallets, chats))
+    format_rate = bench_format(frames)
+    e2e_frames = frames[:args.e2e_frames]
+    sends, p50, p99 = asyncio.run(bench_end_to_end(e2e_frames, wallets, chats, args.rate))
+    
+    return {
+        "wallets": wallet_count,
+        "frames": len(frames),
+        "decode_per_sec": round(decode_rate),
+        "format_per_sec": round(format_rate),
+        "sends": sends,
+        "p50_ms": round(p50, 3),
+        "p99_ms": round(p99, 3),
+        "rss_kb": rss_kb(),
+        "rss_growth_kb": rss_kb() - rss_before,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--wallets", default="1,100,1000", help="Comma separated wallet counts")
+    parser.add_argument("--frames", type=int, default=20000, help="Synthetic frames per run")
+    parser.add_argument("--e2e-frames", type=int, default=2000, help="Frames replayed over the socket for latency")
+    parser.add_argument("--trades-per-frame", type=int, default=5)
+    parser.add_argument("--match-ratio", type=float, default=0.05, help="Share of trades from tracked wallets")
+    parser.add_argument("--rate", type=float, default=500, help="Frames/sec over the socket, 0 for as fast as possible")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--record", help="Write the synthetic frames to this JSONL file and exit")
+    parser.add_argument("--replay", help="Replay frames from a JSONL file instead of generating them")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.one is not None:
+        print(json.dumps(run_one(args, args.one)))
+        return
+    
+    if args.record:
+        rng = random.Random(args.seed)
+        frames = make_frames(make_wallets(100, rng), args.frames, args.trades_per_frame, args.match_ratio, args.seed)
+        with open(args.record, "w") as f:
+            f.write("\n".join(frames) + "\n")
+        print(f"💾 Wrote {len(frames)} frames to {args.record}")
+        return
+    
+    print(f"{'wallets':>8} {'decode/s':>10} {'format/s':>10} {'sends':>7} {'p50 ms':>8} {'p99 ms':>8} {'RSS MiB':>8}")
+    passthrough = [
+        "--frames", str(args.frames), "--e2e-frames", str(args.e2e_frames),
+        "--trades-per-frame", str(args.trades_per_frame), "--match-ratio", str(args.match_ratio),
+        "--rate", str(args.rate), "--seed", str(args.seed),
+    ]
+    if args.replay:
+        passthrough += ["--replay", args.replay]
+    
+    for count in (int(c) for c in args.wallets.split(",")):
+        cmd = [sys.executable, __file__, "--one", str(count)] + passthrough
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{result['wallets']:>8} {result['decode_per_sec']:>10} {result['format_per_sec']:>10} "
+              f"{result['sends']:>7} {result['p50_ms']:>8} {result['p99_ms']:>8} {result['rss_kb'] / 1024:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ConfigStore:
+    """In-memory config with indexed lookups and debounced atomic saves
+    
+    Each chat subscribes to its own wallets. A wallet is tracked while at
+    least one chat subscribes to it; `wallets` is that union, in the order
+    wallets were first added.
+    """
+    
+    def __init__(self, path, fallback_path="config.json", save_delay=1.0):
+        """
+        Initialize store
+        
+        Args:
+            path: Persistent config file (e.g. /data/config.json)
+            fallback_path: Local file used when the persistent path is unusable
+            save_delay: Seconds to coalesce changes before writing to disk
+        """
+        self.path = path
+        self.fallback_path = fallback_path
+        self.save_delay = save_delay
+        
+        self.wallets = []
+        self.wallet_set = set()
+        self.wallet_names = {}
+        self.chat_ids = []
+        self.chat_id_set = set()
+        self._extra = {}
+        
+        # Routing indexes {wallet: {chat_id, ...}} and {chat_id: {wallet: None}}
+        # (dict keys keep a chat's wallets in the order it added them)
+        self.wallet_chats = {}
+        self.chat_wallets = {}
+        
+        # Digest windows {chat_id: {wallet or "*": seconds}}, "*" is chat-wide
+        self.batch_windows = {}
+        
+        # Alert filter rules {chat_id: {wallet or "*": {key: value}}}
+        self.alert_filters = {}
+        
+        # Consensus alert settings {chat_id: [min wallets, window minutes]},
+        # chats not listed or set to [0, 0] have them off
+        self.consensus = {}
+        
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+    
+    @property
+    def persistent(self):
+        """Whether the store is backed by the persistent path"""
+        return self.path != self.fallback_path
+    
+    def load(self):
+        """Read the config file once at startup"""
+        config_dir = os.path.dirname(self.path)
+        if config_dir:
+            try:
+                os.makedirs(config_dir, exist_ok=True)
+                logger.info("✅ Config directory ensured: %s", config_dir)
+            except Exception as e:
+                logger.warning("⚠️  Could not create config dir: %s", e)
+                self.path = self.fallback_path
+                logger.warning("⚠️  Falling back to: %s", self.path)
+        
+        if os.path.exists(self.fallback_path) and not os.path.exists(self.path):
+            logger.info("📦 Migrating config from local to persistent storage...")
+            try:
+                import shutil
+                shutil.copy2(self.fallback_path, self.path)
+                logger.info("✅ Config migrated to %s", self.path)
+            except Exception as e:
+                logger.warning("⚠️  Could not migrate config: %s", e)
+        
+        config = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+                logger.info("📁 Config loaded from %s", self.path)
+            except Exception as e:
+                logger.error("❌ Error loading config: %s", e)
+        else:
+            logger.info("📝 Creating new config at %s", self.path)
+        
+        with self._lock:
+            self.wallets = []
+            self.wallet_set = set()
+            self.wallet_chats = {}
+            self.chat_wallets = {}
+            self.wallet_names = dict(config.pop("wallet_names", {}))
+            
+            self.chat_ids = []
+            self.chat_id_set = set()
+            for chat_id in config.pop("chat_ids", []):
+                self.add_chat(chat_id)
+            
+            wallets = config.pop("wallets", [])
+            subscriptions = config.pop("subscriptions", None)
+            if subscriptions is None:
+                # Configs from before per-chat subscriptions sent every
+                # wallet to every chat, keep that routing
+                subscriptions = {chat_id: wallets for chat_id in self.chat_ids}
+            
+            # Global order first so /list and restore keep the old ordering
+            for wallet in wallets:
+                self._track(wallet)
+            for chat_id, chat_wallets in subscriptions.items():
+                for wallet in chat_wallets:
+                    self.subscribe(int(chat_id), wallet)
+            
+            self.batch_windows = {
+                int(chat_id): dict(windows)
+                for chat_id, windows in config.pop("batch_windows", {}).items()
+            }
+            self.alert_filters = {
+                int(chat_id): {key: dict(rule) for key, rule in rules.items()}
+                for chat_id, rules in config.pop("alert_filters", {}).items()
+            }
+            self.consensus = {
+                int(chat_id): list(setting)
+                for chat_id, setting in config.pop("consensus", {}).items()
+            }
+            
+            # Wallets nobody subscribes to any more are not restored
+            for wallet in [w for w in self.wallets if not self.wallet_chats.get(w)]:
+                self._untrack(wallet)
+            
+            # Keys this version doesn't know about are written back untouched
+            self._extra = config
+        
+        return self
+    
+    def has_wallet(self, wallet):
+        """Whether a wallet is tracked by any chat"""
+        return wallet in self.wallet_set
+    
+    def chats_for(self, wallet):
+        """Chats subscribed to a wallet"""
+        return self.wallet_chats.get(wallet.lower(), ())
+    
+    def wallets_for(self, chat_id):
+        """Wallets a chat subscribes to, in the order it added them"""
+        return list(self.chat_wallets.get(chat_id, ()))
+    
+    def is_subscribed(self, chat_id, wallet):
+        """Whether a chat subscribes to a wallet"""
+        return wallet in self.chat_wallets.get(chat_id, ())
+    
+    def name_for(self, wallet):
+        """Display name for a wallet, or None"""
+        return self.wallet_names.get(wallet.lower())
+    
+    def add_chat(self, chat_id):
+        """
+        Register a chat for alerts
+        
+        Returns:
+            True if the chat was new
+        """
+        with self._lock:
+            if chat_id in self.chat_id_set:
+                return False
+            self.chat_ids.append(chat_id)
+            self.chat_id_set.add(chat_id)
+            return True
+    
+    def set_name(self, wallet, name):
+        """Set a wallet's display name"""
+        with self._lock:
+            self.wallet_names[wallet] = name
+    
+    def subscribe(self, chat_id, wallet, name=None):
+        """
+        Subscribe a chat to a wallet, optionally naming it
+        
+        Returns:
+            True if no chat tracked the wallet before
+        """
+        with self._lock:
+            self.add_chat(chat_id)
+            if name:
+                self.wallet_names[wallet] = name
+            
+            new_wallet = self._track(wallet)
+            self.wallet_chats[wallet].add(chat_id)
+            self.chat_wallets.setdefault(chat_id, {})[wallet] = None
+            return new_wallet
+    
+    def subscribe_many(self, chat_id, entries):
+        """
+        Subscribe a chat to many wallets in one transaction
+        
+        Args:
+            chat_id: Telegram chat
+            entries: Iterable of (wallet, name or None)
+        
+        Returns:
+            (wallets newly subscribed in this chat, wallets no chat tracked before)
+        """
+        added = []
+        new_wallets = []
+        with self._lock:
+            self.add_chat(chat_id)
+            chat_wallets = self.chat_wallets.setdefault(chat_id, {})
+            for wallet, name in entries:
+                if name:
+                    self.wallet_names[wallet] = name
+                if wallet in chat_wallets:
+                    continue
+                if self._track(wallet):
+                    new_wallets.append(wallet)
+                self.wallet_chats[wallet].add(chat_id)
+                chat_wallets[wallet] = None
+                added.append(wallet)
+        return added, new_wallets
+    
+    def unsubscribe(self, chat_id, wallet):
+        """
+        Unsubscribe a chat from a wallet
+        
+        Returns:
+            True if that was the wallet's last chat and it is no longer tracked
+        """
+        with self._lock:
+            self.chat_wallets.get(chat_id, {}).pop(wallet, None)
+            # Re-adding the wallet later starts from the chat-wide settings again
+            for settings in (self.batch_windows, self.alert_filters):
+                per_wallet = settings.get(chat_id)
+                if per_wallet is not None:
+                    per_wallet.pop(wallet, None)
+                    if not per_wallet:
+                        del settings[chat_id]
+            chats = self.wallet_chats.get(wallet)
+            if chats is None:
+                return False
+            
+            chats.discard(chat_id)
+            if chats:
+                return False
+            
+            self._untrack(wallet)
+            self.wallet_names.pop(wallet, None)
+            return True
+    
+    def batch_window(self, chat_id, wallet):
+        """Digest window in seconds for a wallet's alerts in a chat, or None"""
+        windows = self.batch_windows.get(chat_id)
+        if not windows:
+            return None
+        return windows.get(wallet, windows.get("*"))
+    
+    def set_batch_window(self, chat_id, seconds, wallet=None):
+        """
+        Batch a chat's alerts, for one wallet or chat-wide
+        
+        Args:
+            chat_id: Telegram chat
+            seconds: Window length, None or 0 sends alerts individually again
+            wallet: Only batch this wallet; all of the chat's wallets when None
+        """
+        with self._lock:
+            windows = self.batch_windows.setdefault(chat_id, {})
+            key = wallet or "*"
+            if seconds:
+                windows[key] = seconds
+            else:
+                windows.pop(key, None)
+            if not windows:
+                del self.batch_windows[chat_id]
+    
+    def filter_rule(self, chat_id, wallet):
+        """Effective filter rule for a wallet in a chat: chat-wide keys overridden per wallet"""
+        rules = self.alert_filters.get(chat_id)
+        if not rules:
+            return {}
+        return {**rules.get("*", {}), **rules.get(wallet, {})}
+    
+    def filter_rules(self, chat_id):
+        """A chat's rules as stored {wallet or "*": rule}"""
+        return {key: dict(rule) for key, rule in self.alert_filters.get(chat_id, {}).items()}
+    
+    def set_filter(self, chat_id, key, value, wallet=None):
+        """
+        Set or clear one filter key, for one wallet or chat-wide
+        
+        Args:
+            chat_id: Telegram chat
+            key: Rule key (min_usdc, side, outcome, allow, deny)
+            value: New value, None clears the key
+            wallet: Only filter this wallet; all of the chat's wallets when None
+        """
+        with self._lock:
+            rules = self.alert_filters.setdefault(chat_id, {})
+            rule = rules.setdefault(wallet or "*", {})
+            if value is None:
+                rule.pop(key, None)
+            else:
+                rule[key] = value
+            if not rule:
+                del rules[wallet or "*"]
+            if not rules:
+                del self.alert_filters[chat_id]
+    
+    def clear_filters(self, chat_id, wallet=None):
+        """Drop a chat's chat-wide rule, or one wallet's rule"""
+        with self._lock:
+            rules = self.alert_filters.get(chat_id, {})
+            rules.pop(wallet or "*", None)
+            if not rules:
+                self.alert_filters.pop(chat_id, None)
+    
+    def consensus_setting(self, chat_id):
+        """(min wallets, window minutes) for a chat's consensus alerts, None when off"""
+        setting = self.consensus.get(chat_id)
+        return tuple(setting) if setting and setting[0] else None
+    
+    def set_consensus(self, chat_id, min_wallets, minutes):
+        """Set a chat's consensus threshold, min_wallets 0 turns it off"""
+        with self._lock:
+            self.consensus[chat_id] = [min_wallets, minutes]
+    
+    def _track(self, wallet):
+        """Add a wallet to the tracked set, returns True if it was new"""
+        if wallet in self.wallet_set:
+            return False
+        self.wallets.append(wallet)
+        self.wallet_set.add(wallet)
+        self.wallet_chats[wallet] = set()
+        return True
+    
+    def _untrack(self, wallet):
+        """Drop a wallet from the tracked set"""
+        self.wallets.remove(wallet)
+        self.wallet_set.discard(wallet)
+        self.wallet_chats.pop(wallet, None)
+    
+    def to_dict(self):
+        """Snapshot of the config in its on-disk layout"""
+        with self._lock:
+            config = dict(self._extra)
+            config["wallets"] = list(self.wallets)
+            config["chat_ids"] = list(self.chat_ids)
+            config["wallet_names"] = dict(self.wallet_names)
+            config["subscriptions"] = {
+                str(chat_id): list(wallets)
+                for chat_id, wallets in self.chat_wallets.items()
+                if wallets
+            }
+            config["batch_windows"] = {
+                str(chat_id): dict(windows)
+                for chat_id, windows in self.batch_windows.items()
+            }
+            config["consensus"] = {str(chat_id): list(setting) for chat_id, setting in self.consensus.items()}
+            config["alert_filters"] = {
+                str(chat_id): {key: dict(rule) for key, rule in rules.items()}
+                for chat_id, rules in self.alert_filters.items()
+            }
+            return config
+    
+    def save(self):
+        """Schedule a write; changes within save_delay share one write"""
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.save_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self):
+        """Write pending changes now, returning the path written or None if nothing could be"""
+        # Writers queue up so a newer snapshot is never overwritten by an older one
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                data = json.dumps(self.to_dict(), indent=2)
+            
+            try:
+                self._write_atomic(self.path, data)
+                logger.info("💾 Config saved to %s", self.path)
+                return self.path
+            except Exception as e:
+                logger.error("❌ Error saving config: %s", e)
+            
+            try:
+                self._write_atomic(self.fallback_path, data)
+                logger.warning("💾 Config saved locally as backup to %s", self.fallback_path)
+                return self.fallback_path
+            except Exception as e2:
+                logger.error("❌ Failed to save backup: %s", e2)
+                return None
+    
+    @staticmethod
+    def _write_atomic(path, data):
+        """Write to a temp file in the same directory, then rename over path"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".config-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,158 @@
+import random
+import time
+
+class ReconnectPolicy:
+    """Jittered exponential backoff with a circuit breaker for feed reconnects"""
+    
+    def __init__(self, base_delay=1.0, max_delay=60.0, stable_after=30.0,
+                 failure_threshold=8, cooldown=300.0):
+        """
+        Initialize policy
+        
+        Args:
+            base_delay: Backoff ceiling after the first failure, doubled per failure
+            max_delay: Largest backoff ceiling
+            stable_after: Seconds a connection must stay up to reset the backoff
+            failure_threshold: Consecutive failures that open the circuit
+            cooldown: Seconds the circuit stays open before one trial connect
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+    
+    @property
+    def state(self):
+        """closed, open or half-open"""
+        if self.failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+    
+    def record(self, uptime):
+        """
+        Record how a connection attempt ended
+        
+        Args:
+            uptime: Seconds the connection was up, None if it never opened
+        """
+        # A connection that drops right after opening is a failure too,
+        # otherwise a flapping server would be hammered at base_delay
+        if uptime is not None and uptime >= self.stable_after:
+            self.failures = 0
+            return
+        
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.open_until <= time.monotonic():
+                self.trips += 1
+            self.open_until = time.monotonic() + self.cooldown
+    
+    def next_delay(self):
+        """Seconds to wait before the next connection attempt"""
+        if self.failures >= self.failure_threshold:
+            # Open circuit: wait out the cooldown, then allow a single trial
+            return max(0.0, self.open_until - time.monotonic()) + random.uniform(0, self.base_delay)
+        
+        # Full jitter spreads many clients' retries across the whole window
+        ceiling = min(self.max_delay, self.base_delay * (2 ** self.failures))
+        return random.uniform(0, ceiling)
+
+class ConnectionHealth:
+    """Liveness and throughput numbers for one feed connection"""
+    
+    def __init__(self, rate_window=10.0):
+        """
+        Initialize health
+        
+        Args:
+            rate_window: Seconds per message-rate sample
+        """
+        self.rate_window = rate_window
+        
+        self.connects = 0
+        self.disconnects = 0
+        self.stale_reconnects = 0
+        self.connected_at = None
+        self.last_message_at = None
+        self.pings_since_message = 0
+        
+        self.messages = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._rate = 0.0
+    
+    def on_connected(self):
+        """Record a connection that just opened"""
+        now = time.monotonic()
+        self.connects += 1
+        self.connected_at = now
+        self.last_message_at = now
+        self.pings_since_message = 0
+    
+    def on_disconnected(self):
+        """
+        Record a dropped connection
+        
+        Returns:
+            Seconds the connection was up, None if it never opened
+        """
+        if self.connected_at is None:
+            return None
+        self.disconnects += 1
+        uptime = time.monotonic() - self.connected_at
+        self.connected_at = None
+        return uptime
+    
+    def on_message(self):
+        """Record an inbound frame of any kind"""
+        now = time.monotonic()
+        self.messages += 1
+        self.last_message_at = now
+        self.pings_since_message = 0
+        
+        self._window_count += 1
+        elapsed = now - self._window_start
+        if elapsed >= self.rate_window:
+            self._rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+    
+    def on_ping(self):
+        """Record a keepalive ping sent"""
+        self.pings_since_message += 1
+    
+    def message_age(self):
+        """Seconds since the last frame, None when not connected"""
+        if self.connected_at is None or self.last_message_at is None:
+            return None
+        return time.monotonic() - self.last_message_at
+    
+    def is_stale(self, stale_after, max_missed_pongs):
+        """Whether the feed went silent: no frames, not even pong replies"""
+        age = self.message_age()
+        if age is None:
+            return False
+        return age >= stale_after or self.pings_since_message > max_missed_pongs
+    
+    def message_rate(self):
+        """Frames per second over the last completed sample window"""
+        return self._rate
+    
+    def snapshot(self):
+        """Numbers for status reporting"""
+        uptime = time.monotonic() - self.connected_at if self.connected_at is not None else None
+        return {
+            "connected": self.connected_at is not None,
+            "uptime": uptime,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "stale_reconnects": self.stale_reconnects,
+            "message_age": self.message_age(),
+            "message_rate": self._rate,
+            "messages": self.messages,
+        }
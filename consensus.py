@@ -0,0 +1,157 @@
+import time
+from collections import deque
+from alerts import trade_timestamp, trade_value
+
+class _ChatWindow:
+    """One chat's consensus counters, limited to its own window"""
+    
+    __slots__ = ("totals", "order", "fired")
+    
+    def __init__(self):
+        # {(token, side): {wallet: [fills, value, notional]}}
+        self.totals = {}
+        # Fills in arrival order: (arrived, key, wallet, value, notional)
+        self.order = deque()
+        # {(token, side): (wallets in the last signal, arrived)}
+        self.fired = {}
+    
+    def expire(self, cutoff):
+        """Subtract fills that arrived before cutoff"""
+        order = self.order
+        while order and order[0][0] < cutoff:
+            _, key, wallet, value, notional = order.popleft()
+            wallets = self.totals[key]
+            totals = wallets[wallet]
+            totals[0] -= 1
+            if totals[0]:
+                totals[1] -= value
+                totals[2] -= notional
+                continue
+            del wallets[wallet]
+            if not wallets:
+                del self.totals[key]
+                self.fired.pop(key, None)
+
+class ConsensusDetector:
+    """Spots several tracked wallets trading the same market, outcome and side
+    
+    Every chat with consensus alerts on gets windowed counters per
+    (outcome token, side), {wallet: [fills, value, notional]}, added to
+    as its wallets trade and subtracted from as fills leave its window.
+    Each fill is inserted and expired once per chat, and a check counts
+    distinct wallets, so busy markets and chatty wallets cost O(1) per
+    trade rather than a walk over the window.
+    """
+    
+    def __init__(self, chats_for, setting_for, is_subscribed, allows=None, retention=3600, sweep_interval=60):
+        """
+        Initialize detector
+        
+        Args:
+            chats_for: Function mapping a wallet to the chats subscribed to it
+            setting_for: Function mapping a chat to (min wallets, window minutes), None when off
+            is_subscribed: Function taking (chat_id, wallet)
+            allows: Function taking (chat_id, wallet, trade), False for fills the chat filters out
+            retention: Seconds of the longest window a chat may use
+            sweep_interval: Seconds between expiring every chat, including quiet ones
+        """
+        self.chats_for = chats_for
+        self.setting_for = setting_for
+        self.is_subscribed = is_subscribed
+        self.allows = allows
+        self.retention = retention
+        self.sweep_interval = sweep_interval
+        
+        self.windows = {}
+        self._last_sweep = time.time()
+        self.signals = 0
+    
+    def _sweep(self, now):
+        """Expire every chat and forget chats that turned consensus off"""
+        self._last_sweep = now
+        for chat_id, window in list(self.windows.items()):
+            setting = self.setting_for(chat_id)
+            if setting:
+                window.expire(now - setting[1] * 60)
+            if not setting or not window.order:
+                del self.windows[chat_id]
+    
+    def observe(self, trade):
+        """
+        Add a trade and check the chats following its wallet
+        
+        Returns:
+            List of (chat_id, signal dict) for chats whose threshold was just reached
+        """
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+        
+        ts = trade_timestamp(trade) or now
+        if ts < now - self.retention:
+            # Backfilled history, too old to be a live signal
+            return []
+        
+        wallet = trade.get("proxyWallet", "").lower()
+        side = trade.get("side", "").upper()
+        token = trade.get("asset") or f"{trade.get('conditionId', '')}:{trade.get('outcome', '')}"
+        key = (token, side)
+        try:
+            price = float(trade.get("price", 0))
+            value = trade_value(trade)
+        except (TypeError, ValueError):
+            price = value = 0.0
+        
+        signals = []
+        for chat_id in self.chats_for(wallet):
+            setting = self.setting_for(chat_id)
+            if not setting:
+                continue
+            min_wallets, minutes = setting
+            span = minutes * 60
+            # Too old for this chat's window, or a fill its filter rule hides
+            if ts < now - span:
+                continue
+            if self.allows is not None and not self.allows(chat_id, wallet, trade):
+                continue
+            
+            window = self.windows.get(chat_id)
+            if window is None:
+                window = self.windows[chat_id] = _ChatWindow()
+            window.expire(now - span)
+            wallets = window.totals.get(key)
+            if wallets is None:
+                wallets = window.totals[key] = {}
+            totals = wallets.get(wallet)
+            if totals is None:
+                totals = wallets[wallet] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += value
+            totals[2] += value * price
+            window.order.append((now, key, wallet, value, value * price))
+            
+            if len(wallets) < min_wallets:
+                continue
+            # Wallets the chat dropped since they traded no longer count
+            counted = [(w, t) for w, t in wallets.items() if self.is_subscribed(chat_id, w)]
+            if len(counted) < min_wallets:
+                continue
+            
+            # Once per window, again only when more wallets pile in
+            fired = window.fired.get(key)
+            if fired is not None and fired[1] >= now - span and len(counted) <= fired[0]:
+                continue
+            window.fired[key] = (len(counted), now)
+            self.signals += 1
+            
+            signals.append((chat_id, {
+                "trade": trade,
+                "side": side,
+                "outcome": trade.get("outcome", "Unknown"),
+                "minutes": minutes,
+                "wallets": [
+                    (w, v, vp / v if v else 0.0)
+                    for w, (_, v, vp) in sorted(counted, key=lambda i: -i[1][1])
+                ],
+            }))
+        return signals
@@ -0,0 +1,146 @@
+import time
+from array import array
+
+KEY_MASK = (1 << 64) - 1
+
+class TradeDedup:
+    """Bounded set of recently seen trade keys with TTL and LRU eviction
+    
+    Keys are stored as their 64-bit hash in preallocated arrays, so every
+    entry costs the same few bytes however long the trade IDs are: a ring
+    of (key, expiry) slots, least recently seen first, plus an open-addressing
+    index from key to its current slot. A hit re-appends the key with a
+    fresh expiry; its old slot is skipped when the ring reaches it.
+    """
+    
+    def __init__(self, max_entries=100_000, ttl=6 * 3600):
+        """
+        Initialize cache
+        
+        Args:
+            max_entries: Most ring slots; the least recently seen key is evicted past this
+            ttl: Seconds a key is remembered after it was last seen
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        
+        # Ring of slots, oldest at _head, so expiries are ascending too.
+        # _size counts used slots, _live only those the index points at
+        self._keys = array("Q", bytes(8 * max_entries))
+        self._expiries = array("d", bytes(8 * max_entries))
+        self._head = 0
+        self._size = 0
+        self._live = 0
+        
+        # Linear probing table kept at most half full, each cell holding
+        # slot + 1 so that 0 marks an empty cell
+        capacity = 1 << (2 * max_entries - 1).bit_length()
+        self._index = array("I", bytes(4 * capacity))
+        self._mask = capacity - 1
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def _find(self, key):
+        """Index cell for a key, and its ring slot or -1 if it isn't stored"""
+        index, keys, mask = self._index, self._keys, self._mask
+        i = key & mask
+        while True:
+            cell = index[i]
+            if not cell:
+                return i, -1
+            if keys[cell - 1] == key:
+                return i, cell - 1
+            i = (i + 1) & mask
+    
+    def _pop_oldest(self):
+        """
+        Free the oldest slot, removing its key from the index unless it moved on
+        
+        Returns:
+            True if a live key was removed, False for a slot left behind by a hit
+        """
+        index, keys, mask = self._index, self._keys, self._mask
+        slot = self._head
+        self._head = (slot + 1) % self.max_entries
+        self._size -= 1
+        i, current = self._find(keys[slot])
+        if current != slot:
+            return False
+        
+        # Shift later cells of the probe run back so lookups never stop early
+        j = i
+        while True:
+            j = (j + 1) & mask
+            cell = index[j]
+            if not cell:
+                break
+            home = keys[cell - 1] & mask
+            if (i <= j and (home <= i or home > j)) or (i > j and home <= i and home > j):
+                index[i] = cell
+                i = j
+        index[i] = 0
+        self._live -= 1
+        return True
+    
+    def _expire(self, now):
+        """Drop entries whose TTL has passed"""
+        expiries = self._expiries
+        while self._size and expiries[self._head] <= now:
+            if self._pop_oldest():
+                self.expirations += 1
+    
+    def seen(self, trade_key):
+        """
+        Record a trade key, e.g. (wallet, trade ID)
+        
+        Returns:
+            True if the key was already seen within the TTL
+        """
+        now = time.monotonic()
+        self._expire(now)
+        
+        key = hash(trade_key) & KEY_MASK
+        i, slot = self._find(key)
+        hit = slot >= 0
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._live += 1
+        
+        # A full ring frees its oldest slot first, which may shift this key's cell
+        if self._size == self.max_entries:
+            evicted = self._pop_oldest()
+            i, slot = self._find(key)
+            if hit and slot < 0:
+                # The hit itself was the oldest key, and is re-added below
+                self._live += 1
+            elif evicted:
+                self.evictions += 1
+        
+        new_slot = (self._head + self._size) % self.max_entries
+        self._keys[new_slot] = key
+        self._expiries[new_slot] = now + self.ttl
+        self._index[i] = new_slot + 1
+        self._size += 1
+        return hit
+    
+    def __contains__(self, trade_key):
+        _, slot = self._find(hash(trade_key) & KEY_MASK)
+        return slot >= 0 and self._expiries[slot] > time.monotonic()
+    
+    def __len__(self):
+        return self._live
+    
+    def stats(self):
+        """Counters for status reporting"""
+        return {
+            "size": self._live,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
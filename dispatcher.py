@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import time
+from telegram.error import BadRequest, Forbidden
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+SENDS = Counter("polytracker_alerts_sent_total", "Alerts delivered to Telegram")
+SEND_FAILURES = Counter("polytracker_alert_failures_total", "Alerts dropped after every retry failed")
+SEND_ERRORS = Counter("polytracker_send_errors_total", "Failed Telegram send attempts, including retried ones")
+RATE_LIMITED = Counter("polytracker_send_rate_limited_total", "Send attempts rejected by Telegram with 429")
+SEND_LATENCY = Histogram("polytracker_send_seconds", "Duration of one Telegram Bot API call")
+REPLIES = Counter("polytracker_replies_sent_total", "Command replies sent on the priority lane")
+QUEUE_WAIT = Histogram("polytracker_alert_queue_seconds", "Time an alert waited in its chat lane before sending")
+ALERT_LATENCY = Histogram("polytracker_trade_to_alert_seconds", "Time from a trade arriving on the feed to its alert being delivered")
+
+class TokenBucket:
+    """Async token bucket shared by every send"""
+    
+    def __init__(self, rate, capacity=None):
+        """
+        Initialize bucket
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size, defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+    
+    def take(self):
+        """Take a token without waiting, going into debt if none is left"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+
+def retry_after(error):
+    """Seconds Telegram asked us to wait (RetryAfter), None for other errors"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        return None
+    # int in PTB 20, timedelta in later releases
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+class AlertDispatcher:
+    """Outbound Telegram sends: paced alert lanes plus a priority lane for command replies"""
+    
+    def __init__(self, max_concurrent=8, global_rate=30, private_interval=1.0,
+                 group_interval=3.0, max_retries=3, idle_timeout=60.0,
+                 reply_concurrency=4, private_burst=3, min_rate=1.0):
+        """
+        Initialize dispatcher
+        
+        Args:
+            max_concurrent: Maximum alert sends in flight at once across all chats
+            global_rate: Maximum sends per second across all chats
+            private_interval: Seconds per send to one private chat, sustained
+            group_interval: Seconds per send to one group (20/min)
+            max_retries: Attempts per message before it is dropped
+            idle_timeout: Seconds an empty chat lane is kept before its task exits
+            reply_concurrency: Command replies in flight at once, on top of max_concurrent
+            private_burst: Sends a private chat may get back to back before pacing
+            min_rate: Floor for the global rate when Telegram pushes back
+        """
+        self.max_concurrent = max_concurrent
+        self.global_rate = global_rate
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+        self.idle_timeout = idle_timeout
+        self.reply_concurrency = reply_concurrency
+        self.private_burst = private_burst
+        self.min_rate = min_rate
+        self.bot = None
+        
+        # One FIFO lane per chat {chat_id: (queue, task)}, so a slow or
+        # rate-limited chat only ever delays its own alerts
+        self.lanes = {}
+        self.chat_buckets = {}
+        self._slots = None
+        self._reply_slots = None
+        self._bucket = None
+    
+    @property
+    def pool_size(self):
+        """HTTP connections needed so replies never wait for an alert's connection"""
+        return self.max_concurrent + self.reply_concurrency
+    
+    def current_rate(self):
+        """Global sends/sec currently allowed, lowered after 429s"""
+        return self._bucket.rate if self._bucket is not None else self.global_rate
+    
+    def start(self, bot):
+        """Attach the bot; must be called from the event loop"""
+        self.bot = bot
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._reply_slots = asyncio.Semaphore(self.reply_concurrency)
+        self._bucket = TokenBucket(self.global_rate)
+    
+    async def drain(self, timeout=10.0):
+        """
+        Wait for queued alerts to go out before stopping
+        
+        Args:
+            timeout: Most seconds to wait
+        
+        Returns:
+            True if every lane emptied in time
+        """
+        queues = [q for q, _ in self.lanes.values()]
+        if not queues:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in queues)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ %d alert(s) still queued after %gs, dropping them", self.pending(), timeout)
+            return False
+    
+    def stop(self):
+        """Cancel every chat lane"""
+        for _, task in self.lanes.values():
+            task.cancel()
+        self.lanes.clear()
+    
+    def pending(self):
+        """Number of alerts waiting across all lanes"""
+        return sum(q.qsize() for q, _ in self.lanes.values())
+    
+    def submit(self, chat_id, text, on_done=None, ingested_at=None):
+        """
+        Queue an alert for a chat without waiting
+        
+        Args:
+            chat_id: Telegram chat to deliver to
+            text: Markdown message body
+            on_done: Optional function called with True/False once the send finishes
+            ingested_at: time.monotonic() when the trade arrived, for end-to-end latency
+        """
+        lane = self.lanes.get(chat_id)
+        if lane is None:
+            q = asyncio.Queue()
+            task = asyncio.get_running_loop().create_task(self._run_lane(chat_id, q))
+            lane = self.lanes[chat_id] = (q, task)
+        
+        lane[0].put_nowait((text, on_done, time.monotonic(), ingested_at))
+    
+    def _chat_bucket(self, chat_id):
+        """Per-chat pacing bucket, None when pacing is disabled"""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative IDs are groups and channels, which have the tighter limit
+            interval = self.group_interval if chat_id < 0 else self.private_interval
+            if interval <= 0:
+                return None
+            burst = 1 if chat_id < 0 else self.private_burst
+            bucket = self.chat_buckets[chat_id] = TokenBucket(1 / interval, capacity=burst)
+        return bucket
+    
+    async def reply(self, chat_id, send):
+        """
+        Send a command reply ahead of any queued alerts
+        
+        Replies skip the chat lanes and have their own connection slots; they
+        take their rate-limit tokens without waiting, so alerts yield to them.
+        
+        Args:
+            chat_id: Chat the reply goes to
+            send: Zero-argument coroutine function making the Bot API call
+        
+        Returns:
+            Whatever send returned; the last error is raised if every attempt failed
+        """
+        ok, result = await self._call(chat_id, send, priority=True)
+        if not ok:
+            raise result
+        REPLIES.inc()
+        return result
+    
+    async def _run_lane(self, chat_id, q):
+        """Deliver one chat's alerts in order, paced to its rate limit"""
+        while True:
+            try:
+                text, on_done, queued_at, ingested_at = await asyncio.wait_for(q.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if q.empty():
+                    self.lanes.pop(chat_id, None)
+                    return
+                continue
+            
+            bucket = self._chat_bucket(chat_id)
+            if bucket is not None:
+                await bucket.acquire()
+            QUEUE_WAIT.observe(time.monotonic() - queued_at)
+            ok = await self._send(chat_id, text)
+            if ok and ingested_at is not None:
+                ALERT_LATENCY.observe(time.monotonic() - ingested_at)
+            if on_done is not None:
+                try:
+                    on_done(ok)
+                except Exception as e:
+                    logger.warning("⚠️ Delivery callback failed for %s: %s", chat_id, e, extra={"chat_id": chat_id})
+            q.task_done()
+    
+    async def _send(self, chat_id, text):
+        """Send one alert, retrying inside this chat's lane"""
+        ok, error = await self._call(
+            chat_id, lambda: self.bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown'))
+        if ok:
+            SENDS.inc()
+        else:
+            SEND_FAILURES.inc()
+            logger.error("❌ Failed to send alert to %s: %s", chat_id, error, extra={"chat_id": chat_id})
+        return ok
+    
+    async def _call(self, chat_id, send, priority=False):
+        """
+        Make one Bot API call with rate limiting and retries
+        
+        Returns:
+            (True, result) or (False, last error)
+        """
+        error = None
+        for attempt in range(self.max_retries):
+            if priority:
+                self._bucket.take()
+                bucket = self._chat_bucket(chat_id)
+                if bucket is not None:
+                    bucket.take()
+            else:
+                await self._bucket.acquire()
+            
+            try:
+                async with (self._reply_slots if priority else self._slots):
+                    started = time.monotonic()
+                    result = await send()
+                    SEND_LATENCY.observe(time.monotonic() - started)
+                # Additive increase back towards the configured rate
+                self._bucket.rate = min(self.global_rate, self._bucket.rate + 0.1)
+                return True, result
+            except (BadRequest, Forbidden) as e:
+                # Malformed message, bot blocked or kicked: retrying can't help
+                SEND_ERRORS.inc()
+                return False, e
+            except Exception as e:
+                SEND_ERRORS.inc()
+                error = e
+                wait = retry_after(e)
+                if wait is not None:
+                    # Telegram's flood control: wait as told, and halve the global rate
+                    RATE_LIMITED.inc()
+                    self._bucket.rate = max(self.min_rate, self._bucket.rate / 2)
+                    logger.warning("⚠️ Rate limited sending to %s, retrying in %.0fs", chat_id, wait,
+                                   extra={"chat_id": chat_id})
+                else:
+                    wait = (attempt + 1) * 2
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(wait)
+        return False, error
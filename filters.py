@@ -0,0 +1,93 @@
+from alerts import trade_value
+
+# Rule keys in the order their checks run, cheapest first
+RULE_KEYS = ("side", "outcome", "min_usdc", "deny", "allow")
+
+def market_keys(trade):
+    """Lowercased identifiers a market allow/deny entry can match"""
+    return {
+        str(trade.get(field, "")).lower()
+        for field in ("eventSlug", "slug", "conditionId")
+        if trade.get(field)
+    }
+
+def compile_rule(rule):
+    """
+    Build a predicate from a filter rule
+    
+    Args:
+        rule: Dict with any of side, outcome, min_usdc, deny, allow
+    
+    Returns:
+        Function taking a trade and returning True to alert, None if the rule passes everything
+    """
+    checks = []
+    
+    side = rule.get("side")
+    if side:
+        side = side.upper()
+        checks.append(lambda trade: trade.get("side", "").upper() == side)
+    
+    outcome = rule.get("outcome")
+    if outcome:
+        outcome = outcome.lower()
+        checks.append(lambda trade: str(trade.get("outcome", "")).lower() == outcome)
+    
+    min_usdc = rule.get("min_usdc")
+    if min_usdc:
+        checks.append(lambda trade: trade_value(trade) >= min_usdc)
+    
+    deny = frozenset(m.lower() for m in rule.get("deny") or ())
+    if deny:
+        checks.append(lambda trade: deny.isdisjoint(market_keys(trade)))
+    
+    allow = frozenset(m.lower() for m in rule.get("allow") or ())
+    if allow:
+        checks.append(lambda trade: not allow.isdisjoint(market_keys(trade)))
+    
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda trade: all(check(trade) for check in checks)
+
+class AlertFilters:
+    """Compiled filter predicates per (chat, wallet), rebuilt only when rules change"""
+    
+    def __init__(self, rule_lookup):
+        """
+        Initialize filters
+        
+        Args:
+            rule_lookup: Function mapping (chat_id, wallet) to the effective rule dict
+        """
+        self.rule_lookup = rule_lookup
+        self._compiled = {}
+        self.dropped = 0
+    
+    def allows(self, chat_id, wallet, trade):
+        """Whether a chat should be alerted about a trade, counting the ones dropped"""
+        if self.matches(chat_id, wallet, trade):
+            return True
+        self.dropped += 1
+        return False
+    
+    def matches(self, chat_id, wallet, trade):
+        """Whether a trade passes a chat's rule for a wallet"""
+        key = (chat_id, wallet)
+        try:
+            predicate = self._compiled[key]
+        except KeyError:
+            predicate = self._compiled[key] = compile_rule(self.rule_lookup(chat_id, wallet))
+        
+        if predicate is None:
+            return True
+        try:
+            return bool(predicate(trade))
+        except (TypeError, ValueError):
+            # Malformed numbers: alert rather than silently lose the trade
+            return True
+    
+    def invalidate(self):
+        """Forget compiled predicates after a rule change"""
+        self._compiled.clear()
@@ -0,0 +1,16 @@
+def open_session(pool_size):
+    """
+    Pooled requests session for blocking HTTP calls made from worker threads
+    
+    requests is imported here, on first use, so it stays off the startup path.
+    
+    Args:
+        pool_size: Most connections kept open, one per concurrent call
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
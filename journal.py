@@ -0,0 +1,210 @@
+import json
+import logging
+import time
+from alerts import parse_timestamp
+from sqlite_writer import BatchWriter, open_database, primary_key, rebuild_table
+
+PENDING = 0
+DELIVERED = 1
+FAILED = 2
+
+logger = logging.getLogger(__name__)
+
+# Keyed by wallet too: every tracked wallet in one transaction is its own alert
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS trades (
+        trade_id TEXT NOT NULL,
+        wallet TEXT NOT NULL,
+        ingested_at REAL NOT NULL,
+        payload TEXT NOT NULL,
+        status INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (trade_id, wallet)
+    )
+"""
+
+class TradeJournal:
+    """Crash-safe record of ingested trades and whether their alerts went out
+    
+    Appends are queued in memory and committed in batches by a writer thread
+    into SQLite in WAL mode, so the ingest path never waits on disk.
+    """
+    
+    def __init__(self, path, batch_size=500, flush_interval=0.5, retention=7 * 86400):
+        """
+        Initialize journal
+        
+        Args:
+            path: SQLite database file (e.g. /data/journal.db)
+            batch_size: Most operations committed in one transaction
+            flush_interval: Seconds a queued operation may wait for its batch
+            retention: Seconds rows are kept before being pruned
+        """
+        self.path = path
+        self.retention = retention
+        self._writer = BatchWriter("trade-journal", self._apply, self._prune, batch_size, flush_interval)
+    
+    def _connect(self):
+        """Open the database and create the schema if needed"""
+        conn = open_database(self.path)
+        if primary_key(conn, "trades") == ["trade_id"]:
+            rebuild_table(conn, "trades", SCHEMA)
+        conn.execute(SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS trades_pending ON trades (ingested_at) WHERE status = 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS trades_ingested ON trades (ingested_at)")
+        conn.commit()
+        return conn
+    
+    def last_activity(self):
+        """
+        When the previous run was last live, for backfilling the restart gap
+        
+        Returns:
+            (newest ingested_at or None, {wallet: newest trade timestamp})
+        """
+        conn = self._connect()
+        try:
+            (last_ingested,) = conn.execute("SELECT MAX(ingested_at) FROM trades").fetchone()
+            last_trades = {}
+            for wallet, timestamp in conn.execute(
+                "SELECT wallet, MAX(CAST(json_extract(payload, '$.timestamp') AS REAL)) FROM trades GROUP BY wallet"
+            ):
+                timestamp = parse_timestamp(timestamp)
+                if timestamp is not None:
+                    last_trades[wallet] = timestamp
+            return last_ingested, last_trades
+        finally:
+            conn.close()
+    
+    def history(self, after=None, limit=5000):
+        """
+        One chunk of retained trades, oldest first, for rebuilding derived state
+        
+        Args:
+            after: Position returned with the previous chunk, None to start at the oldest
+            limit: Most rows read
+        
+        Returns:
+            (trade dicts, position of the next chunk or None after the last one)
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT ingested_at, rowid, payload FROM trades WHERE (ingested_at, rowid) > (?, ?) "
+                "ORDER BY ingested_at, rowid LIMIT ?",
+                (*(after or (-1.0, -1)), limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        
+        trades = []
+        for _, _, payload in rows:
+            try:
+                trades.append(json.loads(payload))
+            except ValueError:
+                pass
+        if len(rows) < limit:
+            return trades, None
+        return trades, rows[-1][:2]
+    
+    def open(self, replay_window=3600, dedup_window=6 * 3600):
+        """
+        Open the journal and read back state from the previous run
+        
+        Args:
+            replay_window: Only replay undelivered trades ingested this many seconds ago or later
+            dedup_window: Seconds of trade IDs returned for rebuilding the dedup cache
+        
+        Returns:
+            ((wallet, trade ID) pairs, undelivered trade dicts oldest first)
+        """
+        conn = self._connect()
+        now = time.time()
+        
+        recent_ids = [tuple(row) for row in conn.execute(
+            "SELECT wallet, trade_id FROM trades WHERE ingested_at >= ? ORDER BY ingested_at",
+            (now - dedup_window,),
+        )]
+        
+        undelivered = []
+        for (payload,) in conn.execute(
+            "SELECT payload FROM trades WHERE status = 0 AND ingested_at >= ? ORDER BY ingested_at",
+            (now - replay_window,),
+        ):
+            try:
+                undelivered.append(json.loads(payload))
+            except ValueError:
+                pass
+        
+        # Alerts too old to be worth sending are given up on
+        conn.execute("UPDATE trades SET status = ? WHERE status = 0 AND ingested_at < ?", (FAILED, now - replay_window))
+        conn.commit()
+        
+        self._writer.start(conn)
+        logger.info("📒 Journal opened at %s: %d recent trade(s), %d to replay", self.path, len(recent_ids), len(undelivered))
+        return recent_ids, undelivered
+    
+    def record(self, wallet, trade_id, trade):
+        """Queue an ingested trade as pending delivery"""
+        if not self._writer.running:
+            return
+        self._writer.put(("record", wallet, trade_id, trade, time.time()))
+    
+    def mark(self, wallet, trade_id, status):
+        """Queue a delivery status update"""
+        if not self._writer.running:
+            return
+        self._writer.put(("mark", wallet, trade_id, status, None))
+    
+    def tracker(self, wallet, trade_id, sends):
+        """
+        Callback for dispatcher sends that marks a trade once all of them finish
+        
+        Args:
+            wallet: Wallet the journaled trade was alerted for
+            trade_id: Journaled trade
+            sends: Number of messages carrying this trade
+        
+        Returns:
+            Function taking the success flag of one send
+        """
+        if sends == 0:
+            self.mark(wallet, trade_id, DELIVERED)
+            return None
+        
+        state = {"left": sends, "failed": False}
+        
+        def on_done(ok):
+            state["left"] -= 1
+            state["failed"] = state["failed"] or not ok
+            if state["left"] == 0:
+                self.mark(wallet, trade_id, FAILED if state["failed"] else DELIVERED)
+        
+        return on_done
+    
+    def close(self):
+        """Commit everything queued and stop the writer"""
+        self._writer.close()
+    
+    def _apply(self, conn, batch):
+        """Write one batch in a single transaction"""
+        records = []
+        marks = []
+        for kind, wallet, trade_id, value, ingested_at in batch:
+            if kind == "record":
+                records.append((trade_id, wallet, ingested_at, json.dumps(value)))
+            else:
+                marks.append((value, trade_id, wallet))
+        
+        with conn:
+            if records:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO trades (trade_id, wallet, ingested_at, payload) VALUES (?, ?, ?, ?)",
+                    records,
+                )
+            if marks:
+                conn.executemany("UPDATE trades SET status = ? WHERE trade_id = ? AND wallet = ?", marks)
+    
+    def _prune(self, conn):
+        """Drop rows older than the retention period"""
+        with conn:
+            conn.execute("DELETE FROM trades WHERE ingested_at < ?", (time.time() - self.retention,))
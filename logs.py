@@ -0,0 +1,122 @@
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and extra fields"""
+    
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message template, so per-trade lines can't flood the log
+    
+    Records below WARNING share one bucket per format string; the number of
+    lines dropped is attached to the next one let through as "suppressed".
+    """
+    
+    def __init__(self, rate=5.0, burst=20):
+        """
+        Initialize filter
+        
+        Args:
+            rate: Lines per second allowed for each message template
+            burst: Lines allowed at once before rate limiting kicks in
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+    
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+        
+        now = time.monotonic()
+        tokens, updated, suppressed = self._buckets.get(record.msg, (self.burst, now, 0))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[record.msg] = (tokens, now, suppressed + 1)
+            return False
+        
+        self._buckets[record.msg] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue records with only their message resolved; formatting happens on the listener thread"""
+    
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener = None
+
+def setup_logging(level=None, json_output=None, rate=None):
+    """
+    Route all logging through a queue drained by a background writer thread
+    
+    Args:
+        level: Root level name, defaults to $LOG_LEVEL or INFO
+        json_output: JSON lines when True, plain text when False; defaults to $LOG_FORMAT != "text"
+        rate: Per-template lines/sec below WARNING, defaults to $LOG_RATE or 5 (0 disables)
+    """
+    global _listener
+    if _listener is not None:
+        return
+    
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    if json_output is None:
+        json_output = os.environ.get("LOG_FORMAT", "json").lower() != "text"
+    if rate is None:
+        rate = float(os.environ.get("LOG_RATE", 5))
+    
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if json_output else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    # The caller only pays for a queue put; stdout writes happen on the listener thread
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(RateLimitFilter(rate))
+    
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    
+    # httpx logs every Bot API request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    _listener = QueueListener(records, stream, respect_handler_level=False)
+    _listener.start()
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,11 +1,39 @@
-import json
+import io
 import os
+import importlib.util
+import json
+import logging
+import time
+import signal
 import asyncio
-import queue
 from telegram import Update, BotCommand
-from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 from telegram.request import HTTPXRequest
-from polymarket_tracker import PolymarketMonitor
+from polymarket_tracker import PolymarketFeed, PolymarketMonitor
+from sharding import ShardedFeed
+from dispatcher import AlertDispatcher
+from config_store import ConfigStore
+from alerts import AlertRenderer, format_consensus_message, format_stored_trade, market_link, trade_timestamp, wallet_display
+from batching import AlertBatcher
+from journal import FAILED, TradeJournal
+from trade_store import TradeStore
+from backfill import TradeBackfill
+from positions import PositionBook
+from filters import AlertFilters
+from markets import MarketCache
+from wallet_lists import parse_wallet_list, format_wallet_list
+from consensus import ConsensusDetector
+from metrics import REGISTRY, Counter, Gauge, Histogram
+from webserver import WebServer
+from logs import setup_logging, stop_logging
+from startup import StartupProfile
+import dispatcher as delivery
+
+# Seconds from process start to each stage, reported once the feed is live
+startup = StartupProfile()
+startup.mark("imports")
+
+logger = logging.getLogger("polytracker")
 
 # YOUR TELEGRAM BOT TOKEN
 TELEGRAM_BOT_TOKEN = #You're meant to put your bot token here 
@@ -13,12 +41,7 @@ TELEGRAM_BOT_TOKEN = #You're meant to put your bot token here
 # Railway provides this automatically
 PORT = int(os.environ.get("PORT", 8080))
 # Get Railway's public domain from environment
-RAILWAY_DOMAIN = os.environ.get("RAILWAY_PUBLIC_DOMAIN", None)
-
-if not RAILWAY_DOMAIN:
-    print("⚠️ WARNING: RAILWAY_PUBLIC_DOMAIN not set!")
-    print("⚠️ Please add RAILWAY_PUBLIC_DOMAIN variable in Railway dashboard")
-    RAILWAY_DOMAIN = "your-app.up.railway.app"
+RAILWAY_DOMAIN = os.environ.get("RAILWAY_PUBLIC_DOMAIN") or "your-app.up.railway.app"
 
 WEBHOOK_URL = f"https://{RAILWAY_DOMAIN}/{TELEGRAM_BOT_TOKEN}"
 
@@ -26,138 +49,161 @@ WEBHOOK_URL = f"https://{RAILWAY_DOMAIN}/{TELEGRAM_BOT_TOKEN}"
 CONFIG_DIR = "/data"
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
 
+# Feed worker processes, 0 or 1 keeps the feed in this process
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", 0))
+
+# /metrics is public on the webhook's domain, so trades are only counted
+# per wallet address when this is set (e.g. when scraped over a private network)
+METRICS_WALLET_LABELS = os.environ.get("METRICS_WALLET_LABELS") == "1"
+
 # Global monitors dictionary {wallet: monitor_instance}
 monitors = {}
 
-# Queue for messages from WebSocket threads
-message_queue = queue.Queue()
+# Set once restore() has started the feed; until then commands only subscribe
+restored = asyncio.Event()
 
-async def safe_reply(message, text, max_retries=3, **kwargs):
-    """Send reply with retry logic"""
-    for attempt in range(max_retries):
-        try:
-            return await message.reply_text(text, **kwargs)
-        except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"❌ Failed to send message after {max_retries} attempts: {e}")
-                raise
-            wait_time = (attempt + 1) * 2
-            print(f"⚠️ Message send failed (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-            await asyncio.sleep(wait_time)
-
-def ensure_config_dir():
-    """Ensure the config directory exists"""
-    try:
-        os.makedirs(CONFIG_DIR, exist_ok=True)
-        print(f"✅ Config directory ensured: {CONFIG_DIR}")
-    except Exception as e:
-        print(f"⚠️  Could not create config dir: {e}")
-        global CONFIG_FILE
-        CONFIG_FILE = "config.json"
-        print(f"⚠️  Falling back to: {CONFIG_FILE}")
-
-def load_config():
-    """Load tracked wallets from config file"""
-    ensure_config_dir()
-    
-    local_config = "config.json"
-    if os.path.exists(local_config) and not os.path.exists(CONFIG_FILE):
-        print("📦 Migrating config from local to persistent storage...")
-        try:
-            import shutil
-            shutil.copy2(local_config, CONFIG_FILE)
-            print(f"✅ Config migrated to {CONFIG_FILE}")
-        except Exception as e:
-            print(f"⚠️  Could not migrate config: {e}")
+# Services shared by the handlers, built by build_services() from main().
+# Nothing is constructed at import time: SHARD_WORKERS' spawned processes
+# re-import this file as __mp_main__ and must not build a bot of their own
+config_store = feed = dispatcher = markets = renderer = batcher = None
+journal = trade_store = backfill = positions = alert_filters = consensus = None
+
+def build_services():
+    """Create the config store, feed, delivery and trade-processing services"""
+    global config_store, feed, dispatcher, markets, renderer, batcher
+    global journal, trade_store, backfill, positions, alert_filters, consensus
     
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                print(f"📁 Config loaded from {CONFIG_FILE}")
-                
-                if "wallets" not in config:
-                    config["wallets"] = []
-                if "chat_ids" not in config:
-                    config["chat_ids"] = []
-                if "wallet_names" not in config:
-                    config["wallet_names"] = {}
-                    
-                return config
-        except Exception as e:
-            print(f"❌ Error loading config: {e}")
-            return {"wallets": [], "chat_ids": [], "wallet_names": {}}
+    # Config is read once in main() and served from memory afterwards
+    config_store = ConfigStore(CONFIG_FILE)
     
-    print(f"📝 Creating new config at {CONFIG_FILE}")
-    return {"wallets": [], "chat_ids": [], "wallet_names": {}}
-
-def save_config(config):
-    """Save tracked wallets and chat IDs to config file"""
-    ensure_config_dir()
+    # Shared firehose connection, every monitor subscribes to it. With
+    # SHARD_WORKERS > 1, matching and decoding its frames move into that
+    # many worker processes, each handed its own share of the frames
+    feed = ShardedFeed(SHARD_WORKERS) if SHARD_WORKERS > 1 else PolymarketFeed()
+    
+    # Delivers alerts as soon as the feed hands them over, command replies first
+    dispatcher = AlertDispatcher(max_concurrent=int(os.environ.get("SEND_CONCURRENCY", 8)))
+    
+    # Market slugs, prices and volume for alerts, fetched in the background
+    markets = MarketCache()
+    
+    # Formats each trade once, whichever chats it fans out to
+    renderer = AlertRenderer(config_store.name_for, market_lookup=markets.get)
+    
+    # Folds trades into digests for chats that turned on /batch
+    batcher = AlertBatcher(renderer, dispatcher.submit, config_store.name_for)
+    
+    # Records every trade and its delivery so a restart can pick up where it left off
+    journal = TradeJournal(os.path.join(CONFIG_DIR, "journal.db"))
     
+    # Every tracked trade, kept for /history, /top and /volume
+    trade_store = TradeStore(os.path.join(CONFIG_DIR, "trades.db"))
+    
+    # Pulls trades missed during reconnects and redeploys from the data API
+    backfill = TradeBackfill(feed)
+    
+    # Running positions and PnL per wallet, rebuilt from the journal on startup
+    positions = PositionBook()
+    
+    # Per-chat alert rules, checked before anything is rendered or queued
+    alert_filters = AlertFilters(config_store.filter_rule)
+    
+    # Flags several of a chat's wallets piling into the same side of a market
+    # (opt-in per chat, counting only fills the chat's filter rules let through)
+    consensus = ConsensusDetector(config_store.chats_for, config_store.consensus_setting, config_store.is_subscribed,
+                                  allows=alert_filters.matches)
+
+# Served on /metrics; feed and queue numbers are read when scraped
+Counter("polytracker_frames_received_total", "Frames received from the feed", func=lambda: feed.frames_received)
+Counter("polytracker_frames_decoded_total", "Frames that named a tracked wallet and were decoded", func=lambda: feed.frames_decoded)
+Counter("polytracker_dedup_hits_total", "Trades dropped as duplicates", func=lambda: feed.seen_trades.hits)
+Counter("polytracker_reconnects_total", "Feed reconnects", func=lambda: max(0, feed.health.connects - 1))
+Counter("polytracker_stale_reconnects_total", "Feed reconnects forced by silence", func=lambda: feed.health.stale_reconnects)
+Counter("polytracker_backfilled_trades_total", "Trades recovered from the data API", func=lambda: backfill.recovered)
+Counter("polytracker_alerts_filtered_total", "Chat alerts skipped by filter rules", func=lambda: alert_filters.dropped)
+Counter("polytracker_consensus_signals_total", "Consensus alerts raised", func=lambda: consensus.signals)
+Counter("polytracker_market_cache_hits_total", "Market metadata lookups served from cache", func=lambda: markets.hits)
+Counter("polytracker_market_cache_misses_total", "Market metadata lookups queued for fetching", func=lambda: markets.misses)
+Counter("polytracker_market_fetch_failures_total", "Failed market metadata refreshes", func=lambda: markets.failures)
+Gauge("polytracker_market_cache_size", "Markets with cached metadata", func=lambda: len(markets.entries))
+Gauge("polytracker_feed_connected", "1 while the feed connection is open", func=lambda: int(feed.connected))
+Gauge("polytracker_alert_queue_depth", "Alerts waiting in chat lanes", func=lambda: dispatcher.pending())
+Gauge("polytracker_send_rate_limit", "Global sends/sec currently allowed", func=lambda: dispatcher.current_rate())
+Gauge("polytracker_trade_store_pending", "Trades waiting to be written to the history store", func=lambda: trade_store.pending())
+Gauge("polytracker_batched_trades", "Trades waiting in open digest windows", func=lambda: batcher.pending())
+Gauge("polytracker_tracked_wallets", "Wallets tracked across all chats", func=lambda: len(config_store.wallets))
+TRADES_MATCHED = Counter("polytracker_trades_matched_total", "New trades from tracked wallets",
+                         labels=("wallet",) if METRICS_WALLET_LABELS else ())
+FEED_LAG = Histogram("polytracker_feed_lag_seconds", "Time from a trade's timestamp to it arriving here",
+                     buckets=(0.5, 1, 2, 5, 10, 30, 60, 300))
+
+async def safe_reply(message, text, **kwargs):
+    """Send a reply on the dispatcher's priority lane, retrying and honoring flood control"""
+    return await safe_send(message, lambda: message.reply_text(text, **kwargs))
+
+async def safe_send(message, send):
+    """Send any reply call on the dispatcher's priority lane, logging if every attempt failed"""
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
-        print(f"💾 Config saved to {CONFIG_FILE}")
-        return True
+        return await dispatcher.reply(message.chat_id, send)
     except Exception as e:
-        print(f"❌ Error saving config: {e}")
-        
-        try:
-            local_file = "config.json"
-            with open(local_file, 'w') as f:
-                json.dump(config, f, indent=2)
-            print(f"💾 Config saved locally as backup to {local_file}")
-            return True
-        except Exception as e2:
-            print(f"❌ Failed to save backup: {e2}")
-            return False
-
-def format_trade_message(trade):
-    """Format trade data for Telegram"""
-    side = trade.get("side", "").upper()
-    action = "🟢 BUY" if side == "BUY" else "🔴 SELL"
-    
-    price = float(trade.get("price", 0))
-    size = float(trade.get("size", 0))
-    usdc_size = float(trade.get("usdcSize", 0))
-    total_value = usdc_size if usdc_size > 0 else (price * size)
-    
-    market = trade.get("title", "Unknown Market")
-    outcome = trade.get("outcome", "Unknown")
-    tx_hash = trade.get("transactionHash", "Unknown")
-    wallet = trade.get("proxyWallet", "Unknown")
-    
-    config = load_config()
-    wallet_name = config.get("wallet_names", {}).get(wallet.lower(), None)
-    wallet_display = f"*{wallet_name}*" if wallet_name else f"`{wallet[:10]}...{wallet[-8:]}`"
-    
-    event_slug = trade.get("eventSlug", "")
-    if event_slug:
-        market_url = f"https://polymarket.com/event/{event_slug}"
-        market_link = f"[{market[:80]}]({market_url})"
-    else:
-        import urllib.parse
-        search_query = urllib.parse.quote(market[:50])
-        market_url = f"https://polymarket.com/search?q={search_query}"
-        market_link = f"[{market[:80]}]({market_url})"
-    
-    message = f"""
-🔥 *NEW TRADE DETECTED!* 🔥
+        logger.error("❌ Failed to send message: %s", e, extra={"chat_id": message.chat_id})
+        raise
 
-⚡ *Action:* {action}
-📊 *Market:* {market_link}
-🎯 *Outcome:* {outcome}
-💰 *Size:* {size:.2f} shares
-💵 *Price:* ${price:.4f}
-💸 *Total:* ${total_value:.2f}
+def on_trade(trade):
+    """Update the wallet's position, then alert its subscribers"""
+    positions.apply(trade)
+    deliver_trade(trade)
+    trade_store.add(trade)
+    
+    for chat_id, consensus_signal in consensus.observe(trade):
+        logger.info("🚨 Consensus in chat %s: %d wallets", chat_id, len(consensus_signal["wallets"]))
+        dispatcher.submit(chat_id, format_consensus_message(consensus_signal, config_store.name_for))
 
-👤 *Wallet:* {wallet_display}
-🔗 [View Transaction](https://polygonscan.com/tx/{tx_hash})
+def deliver_trade(trade):
+    """Render a detected trade once and fan it out to the wallet's subscribers"""
+    ingested_at = time.monotonic()
+    wallet = trade.get("proxyWallet", "").lower()
+    trade_id = trade.get("transactionHash") or trade.get("id")
+    # Rate limited per template by the log filter, so bursts can't flood stdout
+    logger.info("🔥 Trade detected for %s...", wallet[:10], extra={"wallet": wallet, "trade_id": trade_id})
+    
+    if METRICS_WALLET_LABELS:
+        TRADES_MATCHED.inc(wallet)
+    else:
+        TRADES_MATCHED.inc()
+    timestamp = trade_timestamp(trade)
+    if timestamp is not None:
+        FEED_LAG.observe(max(0.0, time.time() - timestamp))
+    
+    chats = [chat_id for chat_id in config_store.chats_for(wallet) if alert_filters.allows(chat_id, wallet, trade)]
+    journal.record(wallet, trade_id, trade)
+    on_done = journal.tracker(wallet, trade_id, len(chats))
+    
+    message = None
+    try:
+        for chat_id in chats:
+            window = config_store.batch_window(chat_id, wallet)
+            if window:
+                batcher.add(chat_id, window, trade, on_done)
+                continue
+            
+            if message is None:
+                message = renderer.render(trade) + holding_line(trade)
+            dispatcher.submit(chat_id, message, on_done, ingested_at)
+    except Exception:
+        # Left pending, a trade that can't be rendered would replay on every restart
+        journal.mark(wallet, trade_id, FAILED)
+        raise
 
-💡 *To copy:* Click market link above → {side} "{outcome}"
-"""
-    return message
+def holding_line(trade):
+    """Position annotation for an alert, empty if the wallet's position is unknown"""
+    holding = positions.holding(trade)
+    if holding is None:
+        return ""
+    shares, avg_price = holding
+    if shares <= 0:
+        return "📦 *Position:* closed\n"
+    return f"📦 *Now holds:* {shares:,.2f} shares (avg ${avg_price:.4f})\n"
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start command - show welcome message"""
@@ -168,8 +214,18 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 *Commands:*
 /add [name] <wallet> - Add wallet to track with optional name
-/remove <wallet> - Remove wallet
-/list - Show tracked wallets
+/remove <wallet> - Remove wallet from this chat
+/list - Show wallets tracked in this chat
+/import - Add many wallets from a pasted list or an attached file
+/export - Download this chat's wallets as a file
+/batch <seconds|off> [wallet] - Send digests instead of one alert per trade
+/filter [rule] [wallet] - Skip alerts below a size, for a side, market or outcome
+/consensus <wallets> [minutes] | off - Alert when several wallets make the same trade
+/positions <wallet> - Show a wallet's open positions
+/pnl - Show PnL for wallets tracked in this chat
+/history <wallet|market> [n] - Show recent stored trades
+/top [hours] - Largest trades by this chat's wallets (default 24h)
+/volume [hours] - Trading volume per wallet (default 24h)
 /status - Show monitoring status
 /help - Show this message
 
@@ -182,7 +238,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def add_wallet(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Add a wallet to track"""
-    print(f"📨 Received /add from user {update.effective_user.id}")
+    logger.info("📨 Received /add from user %s", update.effective_user.id)
     
     if not context.args:
         await safe_reply(update.message, "❌ Please provide a wallet address\nExample: /add 0x... [optional name]")
@@ -196,48 +252,38 @@ async def add_wallet(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if len(context.args) > 1:
         wallet_name = " ".join(context.args[1:]).strip()
     
-    config = load_config()
-    
     chat_id = update.effective_chat.id
-    if chat_id not in config.get("chat_ids", []):
-        if "chat_ids" not in config:
-            config["chat_ids"] = []
-        config["chat_ids"].append(chat_id)
-        print(f"✅ Added chat ID {chat_id} to config")
+    if config_store.add_chat(chat_id):
+        config_store.save()
+        logger.info("✅ Added chat ID %s to config", chat_id)
     
-    if wallet in config["wallets"]:
+    if config_store.is_subscribed(chat_id, wallet):
         if wallet_name:
-            config["wallet_names"][wallet] = wallet_name
-            save_config(config)
+            config_store.set_name(wallet, wallet_name)
+            config_store.save()
             await safe_reply(update.message, f"✅ Updated name to: *{wallet_name}*\n✅ Monitoring is active!", parse_mode='Markdown')
         else:
             await safe_reply(update.message, f"⚠️ Already tracking: `{wallet}`\n✅ Monitoring is active!", parse_mode='Markdown')
         return
     
-    config["wallets"].append(wallet)
-    if wallet_name:
-        if "wallet_names" not in config:
-            config["wallet_names"] = {}
-        config["wallet_names"][wallet] = wallet_name
+    new_wallet = config_store.subscribe(chat_id, wallet, wallet_name)
+    # Written now rather than debounced, so the reply reports where it landed
+    saved = await asyncio.to_thread(config_store.flush)
     
-    if save_config(config):
+    if saved is None:
+        await safe_reply(update.message, f"❌ Config could not be saved, this wallet may be lost on restart")
+    elif saved != config_store.fallback_path:
         await safe_reply(update.message, f"💾 Config saved to persistent storage")
     else:
         await safe_reply(update.message, f"⚠️ Config saved locally (persistent storage failed)")
     
-    def on_trade(trade):
-        """Callback when trade is detected"""
-        message = format_trade_message(trade)
-        print(f"🔥 Trade detected for {wallet[:10]}..., queuing message for chat {chat_id}")
-        
-        for cid in config.get("chat_ids", [chat_id]):
-            message_queue.put((cid, message))
-    
-    monitor = PolymarketMonitor(wallet, on_trade)
-    monitor.start()
-    monitors[wallet] = monitor
-    
-    print(f"✅ Started monitoring {wallet[:10]}...")
+    # Another chat may already track this wallet, then only routing changes
+    if new_wallet:
+        monitor = PolymarketMonitor(wallet, on_trade, feed)
+        monitor.start()
+        monitors[wallet] = monitor
+        start_feed()
+        logger.info("✅ Started monitoring %s...", wallet[:10], extra={"wallet": wallet})
     name_display = f" as *{wallet_name}*" if wallet_name else ""
     await safe_reply(update.message, f"✅ Now tracking: `{wallet}`{name_display}\n⚡ You'll receive instant alerts with clickable market links!", parse_mode='Markdown')
 
@@ -251,59 +297,425 @@ async def remove_wallet(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not wallet.startswith("0x"):
         wallet = "0x" + wallet
     
-    config = load_config()
-    
-    if wallet not in config["wallets"]:
+    chat_id = update.effective_chat.id
+    if not config_store.is_subscribed(chat_id, wallet):
         await safe_reply(update.message, f"⚠️ Not tracking: `{wallet}`", parse_mode='Markdown')
         return
     
-    config["wallets"].remove(wallet)
-    if wallet in config.get("wallet_names", {}):
-        del config["wallet_names"][wallet]
-    
-    save_config(config)
+    last_chat = config_store.unsubscribe(chat_id, wallet)
+    config_store.save()
     
-    if wallet in monitors:
+    # Keep the monitor while other chats still follow the wallet
+    if last_chat and wallet in monitors:
         monitors[wallet].stop()
         del monitors[wallet]
     
     await safe_reply(update.message, f"✅ Stopped tracking: `{wallet}`", parse_mode='Markdown')
 
 async def list_wallets(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """List all tracked wallets"""
-    config = load_config()
+    """List wallets tracked in this chat"""
+    wallets = config_store.wallets_for(update.effective_chat.id)
     
-    if not config["wallets"]:
+    if not wallets:
         await safe_reply(update.message, "🔭 No wallets being tracked\n\nUse /add [name] <wallet> to start tracking")
         return
     
     message = "📋 *Tracked Wallets:*\n\n"
-    for i, wallet in enumerate(config["wallets"], 1):
-        wallet_name = config.get("wallet_names", {}).get(wallet, None)
+    for i, wallet in enumerate(wallets, 1):
+        wallet_name = config_store.name_for(wallet)
         if wallet_name:
             message += f"{i}. *{wallet_name}* 🟢\n   `{wallet}`\n\n"
         else:
             message += f"{i}. `{wallet}` 🟢\n\n"
     
-    message += f"✅ All {len(config['wallets'])} wallet(s) are being monitored!"
+    message += f"✅ All {len(wallets)} wallet(s) are being monitored!"
     
     await safe_reply(update.message, message, parse_mode='Markdown')
 
+# Largest /import file accepted
+MAX_IMPORT_BYTES = 1024 * 1024
+
+async def import_wallets(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Add many wallets at once from a pasted list or a file"""
+    message = update.message
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+    
+    if document is not None:
+        if document.file_size and document.file_size > MAX_IMPORT_BYTES:
+            await safe_reply(message, "❌ File too large, the limit is 1 MB")
+            return
+        file = await document.get_file()
+        text = bytes(await file.download_as_bytearray()).decode("utf-8", errors="replace")
+    else:
+        parts = (message.text or "").split(None, 1)
+        text = parts[1] if len(parts) > 1 else ""
+    
+    entries, skipped = parse_wallet_list(text)
+    if not entries:
+        await safe_reply(message, "❌ No wallet addresses found\n\nPaste one per line after /import (optionally with a name), or send a file with /import as its caption")
+        return
+    
+    chat_id = update.effective_chat.id
+    added, new_wallets = config_store.subscribe_many(chat_id, entries)
+    config_store.save()
+    
+    # One index update for every wallet no other chat tracked yet
+    if new_wallets:
+        monitors.update(PolymarketMonitor.start_many(new_wallets, on_trade, feed))
+        start_feed()
+    logger.info("📥 Imported %d wallet(s) into chat %s, %d new", len(added), chat_id, len(new_wallets))
+    
+    summary = f"📥 Imported {len(added)} wallet(s)"
+    if len(entries) > len(added):
+        summary += f", {len(entries) - len(added)} already tracked here"
+    if skipped:
+        summary += f", {skipped} line(s) skipped"
+    await safe_reply(message, summary + "\n⚡ Monitoring is active!")
+
+async def export_wallets(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send this chat's wallets as a file /import can read back"""
+    wallets = config_store.wallets_for(update.effective_chat.id)
+    if not wallets:
+        await safe_reply(update.message, "🔭 No wallets being tracked\n\nUse /add [name] <wallet> to start tracking")
+        return
+    
+    data = format_wallet_list(wallets, config_store.name_for).encode()
+    # A fresh buffer per attempt, as a retried upload reads it from the start
+    await safe_send(update.message, lambda: update.message.reply_document(
+        document=io.BytesIO(data),
+        filename="wallets.csv",
+        caption=f"📤 {len(wallets)} wallet(s). Send this file with /import as its caption to restore them.",
+    ))
+
+async def batch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Turn digest mode on or off for this chat or one of its wallets"""
+    if not context.args:
+        await safe_reply(update.message, "❌ Please provide a window in seconds or 'off'\nExample: /batch 60 [wallet]")
+        return
+    
+    chat_id = update.effective_chat.id
+    setting = context.args[0].strip().lower()
+    
+    wallet = None
+    if len(context.args) > 1:
+        wallet = context.args[1].strip().lower()
+        if not wallet.startswith("0x"):
+            wallet = "0x" + wallet
+        if not config_store.is_subscribed(chat_id, wallet):
+            await safe_reply(update.message, f"⚠️ Not tracking: `{wallet}`", parse_mode='Markdown')
+            return
+    
+    if setting == "off":
+        seconds = None
+    else:
+        try:
+            seconds = int(setting)
+        except ValueError:
+            seconds = -1
+        if not 5 <= seconds <= 3600:
+            await safe_reply(update.message, "❌ Window must be between 5 and 3600 seconds, or 'off'")
+            return
+    
+    config_store.set_batch_window(chat_id, seconds, wallet)
+    config_store.save()
+    
+    target = f"`{wallet}`" if wallet else "this chat"
+    if seconds:
+        await safe_reply(update.message, f"📦 Batching alerts for {target} every {seconds}s", parse_mode='Markdown')
+    else:
+        await safe_reply(update.message, f"⚡ Instant alerts for {target}", parse_mode='Markdown')
+
+FILTER_USAGE = """❌ Usage:
+/filter - Show this chat's rules
+/filter min <usdc> [wallet] - Skip trades worth less (0 clears)
+/filter side <buy|sell|any> [wallet]
+/filter outcome <name|any> [wallet]
+/filter allow <market slug...|none> [wallet] - Only these markets
+/filter deny <market slug...|none> [wallet] - Never these markets
+/filter clear [wallet]"""
+
+def describe_rule(rule):
+    """One-line summary of a filter rule"""
+    parts = []
+    if rule.get("min_usdc"):
+        parts.append(f"≥ ${rule['min_usdc']:,.2f}")
+    if rule.get("side"):
+        parts.append(f"{rule['side']} only")
+    if rule.get("outcome"):
+        parts.append(f"outcome {rule['outcome']}")
+    if rule.get("allow"):
+        parts.append(f"only {', '.join(rule['allow'])}")
+    if rule.get("deny"):
+        parts.append(f"not {', '.join(rule['deny'])}")
+    return "; ".join(parts) or "everything"
+
+async def filter_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Set, clear or show this chat's alert filter rules"""
+    chat_id = update.effective_chat.id
+    args = [a.strip() for a in context.args or ()]
+    
+    if not args:
+        rules = config_store.filter_rules(chat_id)
+        if not rules:
+            await safe_reply(update.message, "🔎 No filters, every trade is sent\n\nUse /filter min 100 to skip small fills")
+            return
+        message = "🔎 *Alert filters:*\n\n"
+        for key, rule in rules.items():
+            target = "All wallets" if key == "*" else wallet_display(key, config_store.name_for(key))
+            message += f"{target}: {describe_rule(rule)}\n"
+        await safe_reply(update.message, message, parse_mode='Markdown')
+        return
+    
+    # A trailing address scopes the rule to one wallet (condition IDs are longer)
+    wallet = None
+    if len(args) > 1 and args[-1].lower().startswith("0x") and len(args[-1]) == 42:
+        wallet = args.pop().lower()
+        if not config_store.is_subscribed(chat_id, wallet):
+            await safe_reply(update.message, f"⚠️ Not tracking: `{wallet}`", parse_mode='Markdown')
+            return
+    
+    command, values = args[0].lower(), args[1:]
+    if command == "clear":
+        config_store.clear_filters(chat_id, wallet)
+    elif command in ("min", "side", "outcome", "allow", "deny") and values:
+        value = values[0].lower()
+        if command == "min":
+            try:
+                amount = float(value.lstrip("$"))
+            except ValueError:
+                amount = -1
+            if amount < 0:
+                await safe_reply(update.message, "❌ Minimum must be a USDC amount, e.g. /filter min 100")
+                return
+            config_store.set_filter(chat_id, "min_usdc", amount or None, wallet)
+        elif command == "side":
+            if value not in ("buy", "sell", "any"):
+                await safe_reply(update.message, "❌ Side must be buy, sell or any")
+                return
+            config_store.set_filter(chat_id, "side", None if value == "any" else value.upper(), wallet)
+        elif command == "outcome":
+            config_store.set_filter(chat_id, "outcome", None if value == "any" else " ".join(values), wallet)
+        else:
+            markets = None if value == "none" else [v.lower() for v in values]
+            config_store.set_filter(chat_id, command, markets, wallet)
+    else:
+        await safe_reply(update.message, FILTER_USAGE)
+        return
+    
+    config_store.save()
+    alert_filters.invalidate()
+    
+    target = f"`{wallet}`" if wallet else "this chat"
+    rule = config_store.filter_rule(chat_id, wallet)
+    await safe_reply(update.message, f"🔎 Alerts for {target}: {describe_rule(rule)}", parse_mode='Markdown')
+
+async def consensus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Set how many of this chat's wallets, within how long, make a consensus alert"""
+    chat_id = update.effective_chat.id
+    
+    if not context.args:
+        setting = config_store.consensus_setting(chat_id)
+        if setting:
+            current = f"🚨 Consensus alerts when {setting[0]} wallets trade the same side within {setting[1]} min"
+        else:
+            current = "🔕 Consensus alerts are off"
+        await safe_reply(update.message, current + "\n\nChange with /consensus <wallets> [minutes] or /consensus off")
+        return
+    
+    if context.args[0].strip().lower() == "off":
+        config_store.set_consensus(chat_id, 0, 0)
+        config_store.save()
+        await safe_reply(update.message, "🔕 Consensus alerts turned off")
+        return
+    
+    try:
+        min_wallets = int(context.args[0])
+        minutes = int(context.args[1]) if len(context.args) > 1 else 10
+    except ValueError:
+        min_wallets = minutes = 0
+    if not 2 <= min_wallets <= 50 or not 1 <= minutes <= 60:
+        await safe_reply(update.message, "❌ Use 2-50 wallets and 1-60 minutes\nExample: /consensus 3 10")
+        return
+    
+    config_store.set_consensus(chat_id, min_wallets, minutes)
+    config_store.save()
+    await safe_reply(update.message, f"🚨 Consensus alerts when {min_wallets} wallets trade the same side within {minutes} min")
+
+async def positions_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show a wallet's open positions"""
+    if not context.args:
+        await safe_reply(update.message, "❌ Please provide a wallet address\nExample: /positions 0x...")
+        return
+    
+    wallet = context.args[0].strip().lower()
+    if not wallet.startswith("0x"):
+        wallet = "0x" + wallet
+    
+    held = positions.positions(wallet)
+    if not held:
+        await safe_reply(update.message, f"📭 No open positions seen for `{wallet}`", parse_mode='Markdown')
+        return
+    
+    message = f"📦 *Open positions* for {wallet_display(wallet, config_store.name_for(wallet))}\n\n"
+    for p in held[:15]:
+        link = market_link({"title": p["title"], "eventSlug": p["slug"]})
+        message += (
+            f"🎯 \"{p['outcome']}\" · {link}\n"
+            f"   {p['shares']:,.2f} shares @ ${p['avg_price']:.4f} · last ${p['last_price']:.4f} · uPnL ${p['unrealized']:+,.2f}\n"
+        )
+    if len(held) > 15:
+        message += f"\n➕ {len(held) - 15} smaller position(s) not shown\n"
+    message += "\n💡 Built from trades seen since tracking started"
+    
+    await safe_reply(update.message, message, parse_mode='Markdown')
+
+async def pnl(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show PnL for the wallets tracked in this chat"""
+    wallets = config_store.wallets_for(update.effective_chat.id)
+    if not wallets:
+        await safe_reply(update.message, "🔭 No wallets being tracked\n\nUse /add [name] <wallet> to start tracking")
+        return
+    
+    message = "💰 *PnL* (realized + unrealized at last trade prices)\n\n"
+    realized = unrealized = 0.0
+    for wallet in wallets:
+        totals = positions.totals(wallet)
+        name = wallet_display(wallet, config_store.name_for(wallet))
+        if totals is None:
+            message += f"👤 {name}: no trades yet\n"
+            continue
+        realized += totals["realized"]
+        unrealized += totals["unrealized"]
+        message += (
+            f"👤 {name}: ${totals['realized']:+,.2f} realized, ${totals['unrealized']:+,.2f} unrealized\n"
+            f"   {totals['trades']} trade(s), ${totals['volume']:,.2f} volume\n"
+        )
+    message += f"\n📊 *Total:* ${realized + unrealized:+,.2f} (${realized:+,.2f} realized)"
+    
+    await safe_reply(update.message, message, parse_mode='Markdown')
+
+def parse_hours(args, default=24):
+    """Hours argument of /top and /volume, None if invalid"""
+    if not args:
+        return default
+    try:
+        hours = float(args[0].lower().rstrip("h"))
+    except ValueError:
+        return None
+    return hours if 0 < hours <= 24 * 90 else None
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the most recent stored trades of a wallet or market"""
+    if not context.args:
+        await safe_reply(update.message, "❌ Please provide a wallet or market\nExample: /history 0x... 20")
+        return
+    
+    target = context.args[0].strip().lower()
+    try:
+        limit = max(1, min(int(context.args[1]), 50)) if len(context.args) > 1 else 10
+    except ValueError:
+        await safe_reply(update.message, "❌ The number of trades must be a number\nExample: /history 0x... 20")
+        return
+    
+    # Wallets are 20-byte addresses; condition IDs (32 bytes) and event slugs are markets
+    is_wallet = target.startswith("0x") and len(target) == 42
+    rows = await asyncio.to_thread(
+        trade_store.history, wallet=target if is_wallet else None, market=None if is_wallet else target, limit=limit)
+    if not rows:
+        await safe_reply(update.message, f"📭 No stored trades for `{target}`", parse_mode='Markdown')
+        return
+    
+    if is_wallet:
+        message = f"📜 *Last {len(rows)} trade(s)* by {wallet_display(target, config_store.name_for(target))}\n\n"
+        message += "".join(format_stored_trade(row) for row in rows)
+    else:
+        message = f"📜 *Last {len(rows)} trade(s)* in this market\n\n"
+        message += "".join(format_stored_trade(row, config_store.name_for) for row in rows)
+    
+    await safe_reply(update.message, message, parse_mode='Markdown', disable_web_page_preview=True)
+
+async def top_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the largest recent trades by this chat's wallets"""
+    hours = parse_hours(context.args)
+    if hours is None:
+        await safe_reply(update.message, "❌ Use a number of hours up to 2160\nExample: /top 6")
+        return
+    wallets = config_store.wallets_for(update.effective_chat.id)
+    if not wallets:
+        await safe_reply(update.message, "🔭 No wallets being tracked\n\nUse /add [name] <wallet> to start tracking")
+        return
+    
+    rows = await asyncio.to_thread(trade_store.top, wallets, time.time() - hours * 3600)
+    if not rows:
+        await safe_reply(update.message, f"📭 No trades in the last {hours:g}h")
+        return
+    
+    message = f"🏆 *Largest trades* in the last {hours:g}h\n\n"
+    message += "".join(format_stored_trade(row, config_store.name_for) for row in rows)
+    await safe_reply(update.message, message, parse_mode='Markdown', disable_web_page_preview=True)
+
+async def volume_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show trading volume per wallet tracked in this chat"""
+    hours = parse_hours(context.args)
+    if hours is None:
+        await safe_reply(update.message, "❌ Use a number of hours up to 2160\nExample: /volume 168")
+        return
+    wallets = config_store.wallets_for(update.effective_chat.id)
+    if not wallets:
+        await safe_reply(update.message, "🔭 No wallets being tracked\n\nUse /add [name] <wallet> to start tracking")
+        return
+    
+    rows = await asyncio.to_thread(trade_store.volume, wallets, time.time() - hours * 3600)
+    if not rows:
+        await safe_reply(update.message, f"📭 No trades in the last {hours:g}h")
+        return
+    
+    message = f"📊 *Volume* in the last {hours:g}h\n\n"
+    for row in rows:
+        message += (
+            f"👤 {wallet_display(row['wallet'], config_store.name_for(row['wallet']))}: ${row['volume']:,.2f}\n"
+            f"   {row['trades']} trade(s) · ${row['bought']:,.2f} bought · ${row['sold']:,.2f} sold\n"
+        )
+    message += f"\n💸 *Total:* ${sum(row['volume'] for row in rows):,.2f}"
+    await safe_reply(update.message, message, parse_mode='Markdown')
+
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show monitoring status"""
-    config = load_config()
-    
-    total = len(config["wallets"])
+    total = len(config_store.wallets)
     active = len(monitors)
+    chat_total = len(config_store.wallets_for(update.effective_chat.id))
+    
+    storage_status = "✅ Using persistent storage" if config_store.persistent else "⚠️ Using local storage"
     
-    storage_status = "✅ Using persistent storage" if os.path.exists("/data") else "⚠️ Using local storage"
+    dedup = feed.seen_trades.stats()
+    health = feed.health.snapshot()
+    latency = delivery.ALERT_LATENCY
+    send = delivery.SEND_LATENCY
+    p99 = latency.quantile(0.99)
+    # Past the last bucket the histogram only knows a lower bound
+    p99_text = f"under {p99:g}s" if p99 != float("inf") else f"over {latency.bounds[-1]:g}s"
+    
+    if health["connected"]:
+        age = health["message_age"] or 0
+        feed_status = f"🟢 up {health['uptime'] / 60:.0f}m, {health['message_rate']:.1f} msg/s, last frame {age:.0f}s ago"
+    else:
+        feed_status = f"🔴 down, circuit {feed.reconnect.state}"
     
     message = f"""
 📊 *Monitoring Status*
 
-👥 Tracked wallets: {total}
+👥 Tracked wallets: {total} ({chat_total} in this chat)
 🟢 Active monitors: {active}
+📡 Feed: {feed_status}
+🔁 Reconnects: {max(0, health['connects'] - 1)} ({health['stale_reconnects']} for silence)
+📥 Frames: {feed.frames_received} received, {feed.frames_decoded} decoded, {TRADES_MATCHED.total()} trades matched
+🧹 Dedup cache: {dedup['size']} IDs ({dedup['hits']} hits, {dedup['misses']} misses, {dedup['evictions'] + dedup['expirations']} evicted)
+📬 Queue: {dispatcher.pending()} waiting, {batcher.pending()} batched
+📤 Sent: {delivery.SENDS.total()} ok, {delivery.SEND_FAILURES.total()} dropped, {delivery.RATE_LIMITED.total()} rate limited
+⏱️ Trade to alert: {latency.mean() * 1000:.0f}ms avg, p99 {p99_text}
+⏱️ Telegram send: {send.mean() * 1000:.0f}ms avg, feed lag {FEED_LAG.mean():.1f}s avg
 💾 Storage: {storage_status}
+🚀 Startup: {startup.report()}
 🌐 Mode: Webhook
 🔗 Webhook URL: `{WEBHOOK_URL[:50]}...`
 
@@ -316,30 +728,9 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show help message"""
     await start(update, context)
 
-async def process_message_queue(context: ContextTypes.DEFAULT_TYPE):
-    """Process queued messages from WebSocket threads"""
-    while not message_queue.empty():
-        try:
-            chat_id, message = message_queue.get_nowait()
-            
-            for attempt in range(3):
-                try:
-                    await context.bot.send_message(chat_id=chat_id, text=message, parse_mode='Markdown')
-                    break
-                except Exception as e:
-                    if attempt == 2:
-                        print(f"❌ Failed to send queued message after 3 attempts: {e}")
-                    else:
-                        await asyncio.sleep((attempt + 1) * 2)
-                        
-        except queue.Empty:
-            break
-        except Exception as e:
-            print(f"❌ Error processing message queue: {e}")
-
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors"""
-    print(f"❌ Error occurred: {context.error}")
+    logger.error("❌ Error occurred: %s", context.error, exc_info=context.error)
     
     if update and hasattr(update, 'effective_message') and update.effective_message:
         try:
@@ -347,58 +738,245 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
                 "⚠️ An error occurred. Please try again in a moment."
             )
         except Exception as e:
-            print(f"❌ Could not send error message to user: {e}")
+            logger.error("❌ Could not send error message to user: %s", e)
 
 async def post_init(app: Application):
-    """Initialize bot after startup"""
+    """Start what command handlers need, before the webhook goes live"""
+    # Alerts go out from the same event loop the feed delivers trades on
+    dispatcher.start(app.bot)
+    markets.start()
+
+def start_feed():
+    """Start the feed for a command, unless restore() is still running and will start it itself"""
+    if restored.is_set():
+        feed.start()
+
+def read_journal():
+    """
+    Open the history store and journal, reading back what the previous run left
+    
+    Runs in a worker thread, so it only touches disk; restore() applies the
+    results to positions and the feed on the event loop.
+    
+    Returns:
+        ((last ingested_at, {wallet: last trade ts}) or None,
+        recent (wallet, trade ID) pairs, undelivered trades)
+    """
+    try:
+        trade_store.open()
+    except Exception as e:
+        logger.warning("⚠️ Could not open trade history store, /history, /top and /volume are off: %s", e)
+    try:
+        last_activity = journal.last_activity()
+        recent_ids, undelivered = journal.open()
+        return last_activity, recent_ids, undelivered
+    except Exception as e:
+        logger.warning("⚠️ Could not open trade journal, alerts won't survive restarts: %s", e)
+        return None, [], []
+
+async def rebuild_from_journal():
+    """
+    Fold journaled trades into positions, and into the history store where it is behind
+    
+    The journal is read in chunks off the event loop and each chunk applied
+    on it, so memory stays bounded by the chunk size, not the journal's.
+    
+    Returns:
+        Number of trades that changed a position
+    """
+    # Trades arrive out of timestamp order (feed lag, backfill), so the hour
+    # before the store's newest trade is offered again; duplicates are ignored
+    refill_after = await asyncio.to_thread(trade_store.newest) - 3600
+    applied = 0
+    position = None
+    while True:
+        trades, position = await asyncio.to_thread(journal.history, position)
+        for trade in trades:
+            applied += positions.apply(trade) is not None
+            timestamp = trade_timestamp(trade)
+            if timestamp is None or timestamp > refill_after:
+                trade_store.add(trade)
+        if position is None:
+            return applied
+
+def go_live():
+    """Start monitors for every configured wallet, then the feed; the last step of restoring"""
+    # Commands may have added or removed wallets while the journal loaded;
+    # the rest get one subscription-index update on the shared feed
+    wallets = [wallet for wallet in config_store.wallets if wallet not in monitors]
+    if wallets:
+        monitors.update(PolymarketMonitor.start_many(wallets, on_trade, feed))
+        logger.info("🔄 Restored %d monitor(s)", len(wallets))
+    
+    # One connection on the bot's event loop serves every restored wallet,
+    # each (re)connect backfills whatever happened while it was down
+    feed.on_connected = on_feed_connected
+    restored.set()
+    feed.start()
+
+def on_restore_done(task):
+    """Go live even if restore() failed, rather than leave the feed stopped for good"""
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error("❌ Restoring journaled state failed: %s", task.exception(), exc_info=task.exception())
+    if not restored.is_set():
+        go_live()
+
+def on_feed_connected(since):
+    """Backfill whatever was missed before this (re)connect; the first one finishes startup"""
+    if startup.mark("feed live"):
+        logger.info("⏱️ Startup profile: %s", startup.report())
+    backfill.schedule(since)
+
+async def restore(app: Application):
+    """Bring back journaled state, monitors and the feed while the webhook is already serving"""
+    # Disk-bound, so off the event loop
+    last_activity, recent_ids, undelivered = await asyncio.to_thread(read_journal)
+    
+    # The feed isn't running yet (commands only subscribe until restored is
+    # set), so nothing else is touching positions, dedup or gap tracking
+    if last_activity is not None:
+        feed.last_message_at, feed.last_trade_at = last_activity
+        try:
+            applied = await rebuild_from_journal()
+            logger.info("📦 Rebuilt positions from %d journaled trade(s)", applied)
+        except Exception as e:
+            logger.warning("⚠️ Could not rebuild positions from the journal: %s", e)
+    for key in recent_ids:
+        feed.seen_trades.seen(key)
+    startup.mark("journal")
+    
+    # Alerts that were queued but never sent before the last shutdown
+    if undelivered:
+        logger.info("🔁 Replaying %d undelivered alert(s)...", len(undelivered))
+        # Their positions were already rebuilt from the journal
+        for trade in undelivered:
+            try:
+                deliver_trade(trade)
+            except Exception as e:
+                # deliver_trade marked it failed, so it isn't replayed again
+                logger.warning("⚠️ Could not replay a journaled alert: %s", e)
+    
+    go_live()
+    
     try:
         # Set bot commands menu
         commands = [
             BotCommand("start", "Show welcome message and commands"),
             BotCommand("add", "Add a wallet to track (with optional name)"),
-            BotCommand("remove", "Remove a wallet from tracking"),
-            BotCommand("list", "Show all tracked wallets"),
+            BotCommand("remove", "Remove a wallet from this chat"),
+            BotCommand("list", "Show wallets tracked in this chat"),
+            BotCommand("import", "Add many wallets from a list or file"),
+            BotCommand("export", "Download this chat's wallets"),
+            BotCommand("batch", "Batch alerts into digests (seconds or off)"),
+            BotCommand("filter", "Filter alerts by size, side, market or outcome"),
+            BotCommand("consensus", "Alert when several wallets make the same trade"),
+            BotCommand("positions", "Show a wallet's open positions"),
+            BotCommand("pnl", "Show PnL for wallets in this chat"),
+            BotCommand("history", "Show a wallet's or market's recent trades"),
+            BotCommand("top", "Show the largest trades in the last 24h"),
+            BotCommand("volume", "Show trading volume per wallet"),
             BotCommand("status", "Show monitoring status"),
             BotCommand("help", "Show help message"),
         ]
         await app.bot.set_my_commands(commands)
-        print("✅ Bot commands menu configured")
+        logger.info("✅ Bot commands menu configured")
     except Exception as e:
-        print(f"⚠️ Could not set bot commands (non-critical): {e}")
+        logger.warning("⚠️ Could not set bot commands (non-critical): %s", e)
+
+async def post_shutdown(app: Application):
+    """Stop the feed and alert delivery when the bot shuts down"""
+    feed.stop()
+    markets.stop()
+    # Open digest windows go out now, and get a few seconds to be sent
+    batcher.flush_all()
+    await dispatcher.drain()
+    dispatcher.stop()
+    config_store.flush()
+    journal.close()
+    trade_store.close()
+
+async def serve(app: Application):
+    """Run the bot behind the webhook/metrics server until SIGINT or SIGTERM"""
+    server = WebServer(port=PORT)
+    
+    async def webhook(body):
+        try:
+            update = Update.de_json(json.loads(body), app.bot)
+        except ValueError:
+            return 400, "text/plain", b""
+        await app.update_queue.put(update)
+        if startup.mark("first update"):
+            logger.info("⏱️ First webhook update %.2fs after start", startup.stages["first update"])
+        return 200, "text/plain", b""
+    
+    async def metrics(body):
+        return 200, "text/plain; version=0.0.4", REGISTRY.render().encode()
+    
+    server.route("POST", f"/{TELEGRAM_BOT_TOKEN}", webhook)
+    server.route("GET", "/metrics", metrics)
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    # Commands are served as soon as the webhook is set; the journal,
+    # monitors and feed come back in the background after that
+    async with app:
+        await post_init(app)
+        await app.start()
+        await server.start()
+        await app.bot.set_webhook(url=WEBHOOK_URL, allowed_updates=Update.ALL_TYPES)
+        startup.mark("webhook")
+        logger.info("✅ Serving webhook and /metrics on port %d, %.2fs after start", PORT, startup.stages["webhook"])
+        restoring = asyncio.create_task(restore(app))
+        restoring.add_done_callback(on_restore_done)
+        try:
+            await stop.wait()
+        finally:
+            restoring.cancel()
+            await server.stop()
+            await app.stop()
+            await post_shutdown(app)
 
 def main():
     """Start the bot"""
-    print("=" * 60)
-    print("POLYMARKET BOT - OPTIMIZED FOR RAILWAY")
-    print("=" * 60)
-    
-    print(f"📂 Config path: {CONFIG_FILE}")
-    print(f"📦 Persistent storage mounted: {os.path.exists('/data')}")
-    print(f"📄 Config exists: {os.path.exists(CONFIG_FILE)}")
-    print(f"🌐 Webhook URL: {WEBHOOK_URL}")
-    print(f"🔌 Port: {PORT}")
+    # JSON lines on stdout, written from a background thread
+    setup_logging()
+    if not os.environ.get("RAILWAY_PUBLIC_DOMAIN"):
+        logger.warning("⚠️ WARNING: RAILWAY_PUBLIC_DOMAIN not set!")
+        logger.warning("⚠️ Please add RAILWAY_PUBLIC_DOMAIN variable in Railway dashboard")
+    build_services()
     
     if TELEGRAM_BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        print("❌ Error: Please set your Telegram Bot Token!")
+        logger.error("❌ Error: Please set your Telegram Bot Token!")
         return
     
-    print(f"🔑 Bot token: {TELEGRAM_BOT_TOKEN[:10]}...{TELEGRAM_BOT_TOKEN[-5:]}")
+    logger.info("🚀 POLYMARKET BOT starting: webhook https://%s/..., port %d, config %s",
+                RAILWAY_DOMAIN, PORT, CONFIG_FILE)
     
-    # Create HTTP client with optimized settings
-    print("🔧 Creating HTTP client with optimized settings...")
+    # One connection per concurrent alert plus the reply lane's, so a
+    # command reply never queues for a connection behind an alert backlog.
+    # HTTP/2 multiplexes them over one TLS connection when h2 is installed.
+    http2 = os.environ.get("SEND_HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+    logger.debug("🔧 Creating HTTP client: %d connections, HTTP/%s", dispatcher.pool_size, "2" if http2 else "1.1")
     request = HTTPXRequest(
-        connection_pool_size=8,
-        connect_timeout=30.0,
-        read_timeout=30.0,
-        write_timeout=30.0,
-        pool_timeout=30.0
+        connection_pool_size=dispatcher.pool_size,
+        connect_timeout=10.0,
+        read_timeout=15.0,
+        write_timeout=15.0,
+        pool_timeout=5.0,
+        http_version="2" if http2 else "1.1",
     )
     
-    # Create application
-    app = Application.builder()\
+    # Create application; TELEGRAM_API_URL points it at a local fake Bot API for testing
+    builder = Application.builder()\
         .token(TELEGRAM_BOT_TOKEN)\
-        .request(request)\
-        .build()
+        .request(request)
+    if os.environ.get("TELEGRAM_API_URL"):
+        builder = builder.base_url(os.environ["TELEGRAM_API_URL"].rstrip("/") + "/bot")
+    app = builder.build()
     
     # Add error handler
     app.add_error_handler(error_handler)
@@ -408,47 +986,34 @@ def main():
     app.add_handler(CommandHandler("add", add_wallet))
     app.add_handler(CommandHandler("remove", remove_wallet))
     app.add_handler(CommandHandler("list", list_wallets))
+    app.add_handler(CommandHandler("import", import_wallets))
+    app.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(r"^/import(@\w+)?(\s|$)"), import_wallets))
+    app.add_handler(CommandHandler("export", export_wallets))
+    app.add_handler(CommandHandler("batch", batch))
+    app.add_handler(CommandHandler("filter", filter_command))
+    app.add_handler(CommandHandler("consensus", consensus_command))
+    app.add_handler(CommandHandler("positions", positions_command))
+    app.add_handler(CommandHandler("pnl", pnl))
+    app.add_handler(CommandHandler("history", history_command))
+    app.add_handler(CommandHandler("top", top_command))
+    app.add_handler(CommandHandler("volume", volume_command))
     app.add_handler(CommandHandler("status", status))
     app.add_handler(CommandHandler("help", help_command))
     
-    # Set up post-init for bot commands
-    app.post_init = post_init
-    
-    # Load existing wallets and start monitoring
-    config = load_config()
-    print(f"📋 Found {len(config['wallets'])} wallets")
-    
-    if config["wallets"]:
-        print("🔄 Restoring monitors...")
-        
-        for wallet in config["wallets"]:
-            def make_callback(w):
-                def on_trade(trade):
-                    message = format_trade_message(trade)
-                    print(f"🔥 Trade detected for {w[:10]}...")
-                    for chat_id in config.get("chat_ids", []):
-                        message_queue.put((chat_id, message))
-                return on_trade
-            
-            monitor = PolymarketMonitor(wallet, make_callback(wallet))
-            monitor.start()
-            monitors[wallet] = monitor
-            print(f"  ✅ {wallet[:10]}...")
-    
-    # Start message queue processor
-    app.job_queue.run_repeating(process_message_queue, interval=2.0, first=1.0)
-    
-    print("🚀 Starting webhook server...")
-    print("=" * 60)
-    
-    # Run webhook (NOT polling)
-    app.run_webhook(
-        listen="0.0.0.0",
-        port=PORT,
-        url_path=TELEGRAM_BOT_TOKEN,
-        webhook_url=WEBHOOK_URL,
-        allowed_updates=Update.ALL_TYPES
-    )
+    # Commands need the wallets straight away; monitors are restored after the webhook is up
+    config_store.load()
+    logger.info("📋 Found %d wallets", len(config_store.wallets))
+    startup.mark("config")
+    
+    # The journal and history store live next to the config, on /data unless that failed
+    journal.path = os.path.join(os.path.dirname(config_store.path), "journal.db")
+    trade_store.path = os.path.join(os.path.dirname(config_store.path), "trades.db")
+    
+    # Run webhook (NOT polling), with /metrics served from the same port
+    try:
+        asyncio.run(serve(app))
+    finally:
+        stop_logging()
 
 if __name__ == "__main__":
     main()
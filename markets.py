@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import time
+from http_session import open_session
+
+logger = logging.getLogger(__name__)
+
+def _json_list(value):
+    """Gamma returns some list fields JSON-encoded inside a string"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_market(raw):
+    """
+    Keep the fields alerts use from a Gamma market object
+    
+    Returns:
+        Dict with slug, event_slug, question, prices {outcome: price}, volume, end_date
+    """
+    outcomes = _json_list(raw.get("outcomes"))
+    prices = [_float(p) for p in _json_list(raw.get("outcomePrices"))]
+    events = raw.get("events") or []
+    return {
+        "slug": raw.get("slug") or "",
+        "event_slug": (events[0].get("slug") if events and isinstance(events[0], dict) else "") or "",
+        "question": raw.get("question") or "",
+        "prices": {str(o).lower(): p for o, p in zip(outcomes, prices) if p is not None},
+        "volume": _float(raw.get("volumeNum", raw.get("volume"))),
+        "end_date": (raw.get("endDate") or "")[:10],
+    }
+
+class MarketCache:
+    """Market metadata by condition ID, filled lazily and refreshed in bulk
+    
+    get() never blocks: a miss returns None and queues the ID, and a
+    background task fetches queued and stale markets from the Gamma API in
+    batches. Markets nobody has asked about for `ttl` seconds are evicted.
+    """
+    
+    def __init__(self, base_url="https://gamma-api.polymarket.com", ttl=3600, refresh_interval=60,
+                 batch_size=50, max_entries=10_000, timeout=10.0):
+        """
+        Initialize cache
+        
+        Args:
+            base_url: Gamma API root, point at a local stand-in for testing
+            ttl: Seconds an unused market is kept
+            refresh_interval: Seconds between bulk refreshes of cached markets
+            batch_size: Condition IDs per request
+            max_entries: Most markets kept, least recently used evicted first
+            timeout: Per-request timeout in seconds
+        """
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.timeout = timeout
+        
+        self.session = None
+        
+        # {condition ID: (market dict, fetched_at)} and {condition ID: last used}
+        self.entries = {}
+        self.used_at = {}
+        self._wanted = set()
+        self._wake = None
+        self._task = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.failures = 0
+    
+    def get(self, condition_id):
+        """Cached metadata for a market, None (and queued for fetching) when unknown"""
+        if not condition_id:
+            return None
+        now = time.monotonic()
+        self.used_at[condition_id] = now
+        
+        entry = self.entries.get(condition_id)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        
+        self.misses += 1
+        if condition_id not in self._wanted:
+            self._wanted.add(condition_id)
+            if self._wake is not None:
+                self._wake.set()
+        return None
+    
+    def start(self):
+        """Start the refresh task on the running event loop"""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            if self._wanted:
+                self._wake.set()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self):
+        """Fetch missing markets as soon as they're asked for, refresh the rest periodically"""
+        last_refresh = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Let a burst of misses pile up into one request
+            await asyncio.sleep(0.2)
+            
+            now = time.monotonic()
+            ids = set(self._wanted)
+            if now - last_refresh >= self.refresh_interval:
+                self._evict(now)
+                ids.update(self.entries)
+                last_refresh = now
+            if not ids:
+                continue
+            
+            try:
+                await self.refresh(ids)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("⚠️ Market metadata refresh failed: %s", e)
+                await asyncio.sleep(min(self.refresh_interval, 10))
+            # Anything still missing is retried on the next refresh rather than hammered
+            self._wanted.difference_update(ids)
+    
+    async def refresh(self, condition_ids):
+        """
+        Fetch markets in batches and store them
+        
+        Returns:
+            Number of markets stored
+        """
+        if self.session is None:
+            self.session = open_session(2)
+        ids = list(condition_ids)
+        stored = 0
+        for i in range(0, len(ids), self.batch_size):
+            markets = await asyncio.to_thread(self._fetch, ids[i:i + self.batch_size])
+            fetched_at = time.monotonic()
+            for raw in markets:
+                condition_id = raw.get("conditionId")
+                if condition_id:
+                    self.entries[condition_id] = (parse_market(raw), fetched_at)
+                    self.used_at.setdefault(condition_id, fetched_at)
+                    stored += 1
+        return stored
+    
+    def _evict(self, now):
+        """Drop markets unused for ttl, then the least recently used over max_entries"""
+        for condition_id, used in list(self.used_at.items()):
+            if now - used > self.ttl:
+                del self.used_at[condition_id]
+                self.entries.pop(condition_id, None)
+        
+        overflow = len(self.entries) - self.max_entries
+        if overflow > 0:
+            for condition_id in sorted(self.entries, key=lambda c: self.used_at.get(c, 0))[:overflow]:
+                del self.entries[condition_id]
+                self.used_at.pop(condition_id, None)
+    
+    def _fetch(self, condition_ids):
+        """Blocking GET of one batch of markets"""
+        self.fetches += 1
+        response = self.session.get(
+            f"{self.base_url}/markets",
+            params=[("condition_ids", c) for c in condition_ids] + [("limit", len(condition_ids))],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        markets = response.json()
+        return markets if isinstance(markets, list) else []
@@ -0,0 +1,159 @@
+"""Minimal Prometheus-style metrics
+
+Counters, gauges and histograms register themselves in REGISTRY when
+created; render() produces the text exposition format served on /metrics.
+Values read from other objects (feed counters, queue sizes) are passed as
+functions and sampled at scrape time, so the hot path pays nothing for them.
+"""
+import bisect
+import math
+
+class Registry:
+    """Collection of metrics rendered together"""
+    
+    def __init__(self):
+        self.metrics = []
+    
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+    
+    def get(self, name):
+        """Metric registered under a name, or None"""
+        for metric in self.metrics:
+            if metric.name == name:
+                return metric
+        return None
+    
+    def render(self):
+        """Text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def _labels(names, values):
+    """Render a label set"""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally labelled or read from a function"""
+    
+    kind = "counter"
+    
+    def __init__(self, name, help, labels=(), func=None, registry=REGISTRY):
+        """
+        Initialize counter
+        
+        Args:
+            name: Metric name
+            help: One-line description
+            labels: Label names, values are given to inc()
+            func: Function returning the current total, instead of inc()
+            registry: Registry to add the metric to
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.func = func
+        self.values = {}
+        registry.register(self)
+    
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def value(self, *label_values):
+        if self.func is not None:
+            return self.func()
+        return self.values.get(label_values, 0)
+    
+    def total(self):
+        """Sum over every label set"""
+        if self.func is not None:
+            return self.func()
+        return sum(self.values.values())
+    
+    def samples(self):
+        if self.func is not None:
+            return [f"{self.name} {_number(self.func())}"]
+        if not self.labels and not self.values:
+            return [f"{self.name} 0"]
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in self.values.items()]
+
+class Gauge(Counter):
+    """Value that can go up and down, set directly or read from a function"""
+    
+    kind = "gauge"
+    
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+class Histogram:
+    """Bucketed distribution of observed values"""
+    
+    kind = "histogram"
+    
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        """
+        Initialize histogram
+        
+        Args:
+            name: Metric name
+            help: One-line description
+            buckets: Upper bounds, ascending; +Inf is added
+            registry: Registry to add the metric to
+        """
+        self.name = name
+        self.help = help
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        registry.register(self)
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+    
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+    
+    def samples(self):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_number(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_number(self.sum)}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
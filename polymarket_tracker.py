@@ -1,110 +1,237 @@
+import asyncio
 import json
-import threading
-from websocket import WebSocketApp
+import logging
+import re
+import time
+import websockets
+from alerts import trade_timestamp
+from dedup import TradeDedup
+from connection import ConnectionHealth, ReconnectPolicy
 
-class PolymarketMonitor:
-    """Monitor a Polymarket wallet for real-time trades"""
+logger = logging.getLogger(__name__)
+
+# orjson decodes the firehose several times faster when it is installed
+try:
+    import orjson
+    default_decoder = orjson.loads
+except ImportError:
+    default_decoder = json.loads
+
+# Every trade names its wallet as "proxyWallet":"0x<40 hex>", so a frame
+# can be matched against the dispatch index before it is decoded
+WALLET_PATTERN = re.compile(r'"proxyWallet"\s*:\s*"(0x[0-9a-fA-F]{40})"')
+WALLET_PATTERN_BYTES = re.compile(rb'"proxyWallet"\s*:\s*"(0x[0-9a-fA-F]{40})"')
+
+class PolymarketFeed:
+    """Single shared connection to the Polymarket activity/trades firehose"""
     
-    def __init__(self, wallet_address, on_trade_callback):
+    def __init__(self, ws_url="wss://ws-live-data.polymarket.com", ping_interval=5.0, reconnect=None,
+                 stale_after=30.0, max_missed_pongs=3, dedup=None, decoder=None):
         """
-        Initialize monitor
+        Initialize feed
         
         Args:
-            wallet_address: The wallet address to monitor (0x...)
-            on_trade_callback: Function to call when trade detected, receives trade dict
+            ws_url: Polymarket RTDS WebSocket URL
+            ping_interval: Seconds between keepalive pings
+            reconnect: ReconnectPolicy deciding reconnect delays, a default one when None
+            stale_after: Seconds without any frame before the connection is recycled
+            max_missed_pongs: Pings in a row that may go unanswered before recycling
+            dedup: TradeDedup shared by every wallet, a default one when None
+            decoder: Function decoding a raw frame, orjson when installed else json
         """
-        self.wallet = wallet_address.lower()
-        self.on_trade = on_trade_callback
-        self.ws_url = "wss://ws-live-data.polymarket.com"
-        self.ws_app = None
+        self.ws_url = ws_url
+        self.ping_interval = ping_interval
+        self.reconnect = reconnect or ReconnectPolicy()
+        self.stale_after = stale_after
+        self.max_missed_pongs = max_missed_pongs
+        self.health = ConnectionHealth()
         self.connected = False
         self.running = False
-        self.seen_trades = set()
+        self.seen_trades = dedup if dedup is not None else TradeDedup()
+        self.decode = decoder or default_decoder
         self.first_message_logged = False
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self._task = None
+        
+        # Gap tracking for backfill: wall-clock time of the last frame and
+        # the newest trade timestamp seen per wallet
+        self.last_message_at = None
+        self.last_trade_at = {}
+        
+        # Called with last_message_at each time a connection opens
+        self.on_connected = None
+        
+        # Dispatch index {lowercased proxyWallet: (callback, ...)}
+        # Tuples are replaced, never mutated, so a dispatch in progress keeps
+        # a consistent view while wallets are added or removed.
+        self.subscribers = {}
+        
+    def subscribe(self, wallet_address, on_trade_callback):
+        """
+        Route trades from a wallet to a callback
+        
+        Args:
+            wallet_address: The wallet address to monitor (0x...)
+            on_trade_callback: Function to call when trade detected, receives trade dict
+        """
+        wallet = wallet_address.lower()
+        callbacks = self.subscribers.get(wallet, ())
+        if on_trade_callback not in callbacks:
+            self.subscribers[wallet] = callbacks + (on_trade_callback,)
+    
+    def subscribe_many(self, wallet_addresses, on_trade_callback):
+        """Route several wallets to one callback with a single index swap"""
+        subscribers = dict(self.subscribers)
+        for wallet_address in wallet_addresses:
+            wallet = wallet_address.lower()
+            callbacks = subscribers.get(wallet, ())
+            if on_trade_callback not in callbacks:
+                subscribers[wallet] = callbacks + (on_trade_callback,)
+        self.subscribers = subscribers
+    
+    def unsubscribe(self, wallet_address, on_trade_callback=None):
+        """
+        Stop routing trades from a wallet
+        
+        Args:
+            wallet_address: The wallet address to drop (0x...)
+            on_trade_callback: Only drop this callback; drops all when None
+        """
+        wallet = wallet_address.lower()
+        callbacks = self.subscribers.get(wallet, ())
+        if on_trade_callback is not None:
+            callbacks = tuple(cb for cb in callbacks if cb is not on_trade_callback)
+        else:
+            callbacks = ()
         
+        if callbacks:
+            self.subscribers[wallet] = callbacks
+        else:
+            self.subscribers.pop(wallet, None)
+    
     def start(self):
-        """Start monitoring"""
+        """Start the shared connection as a task on the running event loop"""
         if self.running:
             return
         
         self.running = True
-        self._connect_websocket()
+        self._task = asyncio.get_running_loop().create_task(self._run())
         
     def stop(self):
-        """Stop monitoring"""
+        """Stop the shared connection"""
         self.running = False
         self.connected = False
         
-        if self.ws_app:
-            self.ws_app.close()
-            
-    def _on_message(self, ws, message):
-        """Handle incoming WebSocket messages"""
-        try:
-            data = json.loads(message)
-            
-            # Log first message only
-            if not self.first_message_logged:
-                print(f"✅ Monitor connected for {self.wallet[:10]}...")
-                self.first_message_logged = True
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    def inject(self, trades):
+        """
+        Route trades from another source (e.g. REST backfill) like feed trades
+        
+        Returns:
+            Number of trades that were new after dedup
+        """
+        return self._dispatch(trades)
+    
+    def _dispatch(self, trades):
+        """Hand trades from tracked wallets to their subscribers"""
+        subscribers = self.subscribers
+        dispatched = 0
+        
+        for trade in trades:
+            wallet = trade.get("proxyWallet", "").lower()
+            callbacks = subscribers.get(wallet)
+            if not callbacks:
+                continue
             
-            # Check for trades in 'payload' field
-            if "payload" in data:
-                payload = data["payload"]
-                
-                # Handle list or single trade
-                if isinstance(payload, list):
-                    trades = payload
-                elif isinstance(payload, dict):
-                    trades = [payload]
-                else:
-                    return
-                
-                for trade in trades:
-                    # Check if trade is from our wallet
-                    proxy_wallet = trade.get("proxyWallet", "").lower()
-                    
-                    if proxy_wallet == self.wallet:
-                        trade_id = trade.get("transactionHash") or trade.get("id")
-                        
-                        if trade_id and trade_id not in self.seen_trades:
-                            self.seen_trades.add(trade_id)
-                            print(f"🔥 Trade detected from {self.wallet[:10]}...")
-                            # Call the callback
-                            self.on_trade(trade)
+            # Per wallet, since tracked wallets can fill in the same transaction
+            trade_id = trade.get("transactionHash") or trade.get("id")
+            if not trade_id or self.seen_trades.seen((wallet, trade_id)):
+                continue
             
-            # Alternative: trades directly in data
-            elif "trades" in data:
-                for trade in data["trades"]:
-                    proxy_wallet = trade.get("proxyWallet", "").lower()
-                    
-                    if proxy_wallet == self.wallet:
-                        trade_id = trade.get("transactionHash") or trade.get("id")
-                        
-                        if trade_id and trade_id not in self.seen_trades:
-                            self.seen_trades.add(trade_id)
-                            self.on_trade(trade)
+            timestamp = trade_timestamp(trade)
+            if timestamp is not None and timestamp > self.last_trade_at.get(wallet, 0):
+                self.last_trade_at[wallet] = timestamp
             
-        except json.JSONDecodeError:
-            pass
-        except Exception as e:
-            print(f"⚠️ Error processing message for {self.wallet[:10]}...: {e}")
+            dispatched += 1
+            for callback in callbacks:
+                try:
+                    callback(trade)
+                except Exception as e:
+                    logger.warning("⚠️ Trade callback failed for %s...: %s", wallet[:10], e, extra={"wallet": wallet})
+        
+        return dispatched
     
-    def _on_error(self, ws, error):
-        """Handle WebSocket errors"""
-        print(f"⚠️ WebSocket error for {self.wallet[:10]}...: {error}")
+    def _mentions_tracked(self, message):
+        """Whether a raw frame names any tracked wallet, without decoding it"""
+        subscribers = self.subscribers
+        if not subscribers:
+            return False
+        
+        if isinstance(message, bytes):
+            for match in WALLET_PATTERN_BYTES.finditer(message):
+                if match.group(1).decode().lower() in subscribers:
+                    return True
+        else:
+            for match in WALLET_PATTERN.finditer(message):
+                if match.group(1).lower() in subscribers:
+                    return True
+        return False
     
-    def _on_close(self, ws, close_status_code, close_msg):
-        """Handle WebSocket close"""
-        self.connected = False
+    def _on_message(self, message):
+        """Handle incoming WebSocket messages"""
+        self.frames_received += 1
+        self.last_message_at = time.time()
         
-        if self.running:
-            print(f"⚠️ Connection closed for {self.wallet[:10]}..., reconnecting...")
-            import time
-            time.sleep(5)
-            self._connect_websocket()
+        # Log first message only
+        if not self.first_message_logged:
+            logger.info("✅ Feed connected, routing %d wallet(s)", len(self.subscribers))
+            self.first_message_logged = True
+        
+        trades = self.match(message)
+        if not trades:
+            return
+        
+        try:
+            self._dispatch(trades)
+        except Exception as e:
+            logger.warning("⚠️ Error processing feed message: %s", e)
+    
+    def match(self, message):
+        """
+        Trades in a raw frame that names a tracked wallet
+        
+        Returns:
+            List of trade dicts, empty for pongs, untracked wallets and undecodable frames
+        """
+        # Pongs and trades from wallets nobody tracks are dropped here
+        if not self._mentions_tracked(message):
+            return []
+        
+        try:
+            data = self.decode(message)
+        except ValueError:
+            # json and orjson decode errors are both ValueErrors
+            return []
+        self.frames_decoded += 1
+        if not isinstance(data, dict):
+            return []
+        
+        # Check for trades in 'payload' field, a list or a single trade
+        trades = data.get("payload")
+        if isinstance(trades, dict):
+            trades = [trades]
+        # Alternative: trades directly in data
+        elif "payload" not in data:
+            trades = data.get("trades")
+        if not isinstance(trades, list):
+            return []
+        return [trade for trade in trades if isinstance(trade, dict)]
     
-    def _on_open(self, ws):
+    async def _on_open(self, ws):
         """Handle WebSocket connection open"""
         self.connected = True
         
@@ -119,33 +246,97 @@ class PolymarketMonitor:
             ]
         }
         
-        ws.send(json.dumps(subscription))
+        await ws.send(json.dumps(subscription))
+    
+    async def _ping_loop(self, ws):
+        """Keep connection alive with pings and recycle it if it goes silent"""
+        ping_msg = json.dumps({"action": "ping"})
+        while self.connected and self.running:
+            await asyncio.sleep(self.ping_interval)
+            
+            if self.health.is_stale(self.stale_after, self.max_missed_pongs):
+                logger.warning("⚠️ Feed silent for %.0fs, forcing reconnect...", self.health.message_age())
+                self.health.stale_reconnects += 1
+                await ws.close()
+                return
+            
+            await ws.send(ping_msg)
+            self.health.on_ping()
+    
+    async def _run(self):
+        """Own the connection: read until it drops, then reconnect with backoff"""
+        first_attempt = True
+        while self.running:
+            if not first_attempt:
+                delay = self.reconnect.next_delay()
+                logger.warning("⚠️ Feed connection closed, reconnecting in %.1fs (%s)...", delay, self.reconnect.state)
+                await asyncio.sleep(delay)
+            first_attempt = False
+            
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=None, open_timeout=10) as ws:
+                    await self._on_open(ws)
+                    self.health.on_connected()
+                    if self.on_connected is not None:
+                        self.on_connected(self.last_message_at)
+                    
+                    pinger = asyncio.create_task(self._ping_loop(ws))
+                    try:
+                        async for message in ws:
+                            self.health.on_message()
+                            self._on_message(message)
+                    finally:
+                        pinger.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Feed WebSocket error: %s", e)
+            
+            self.connected = False
+            self.reconnect.record(self.health.on_disconnected())
+
+class PolymarketMonitor:
+    """Monitor a Polymarket wallet for real-time trades"""
+    
+    def __init__(self, wallet_address, on_trade_callback, feed):
+        """
+        Initialize monitor
         
-        # Keep connection alive with pings
-        def ping_thread():
-            import time
-            while self.connected and self.running:
-                try:
-                    time.sleep(5)
-                    if self.connected and self.running:
-                        ping_msg = {"action": "ping"}
-                        ws.send(json.dumps(ping_msg))
-                except:
-                    break
-        
-        threading.Thread(target=ping_thread, daemon=True).start()
+        Args:
+            wallet_address: The wallet address to monitor (0x...)
+            on_trade_callback: Function to call when trade detected, receives trade dict
+            feed: Shared PolymarketFeed the monitor subscribes to
+        """
+        self.wallet = wallet_address.lower()
+        self.on_trade = on_trade_callback
+        self.feed = feed
+        self.running = False
+        
+    @classmethod
+    def start_many(cls, wallet_addresses, on_trade_callback, feed):
+        """
+        Start monitors for many wallets with one feed subscription update
+        
+        Returns:
+            {wallet: monitor}
+        """
+        monitors = {}
+        for wallet_address in wallet_addresses:
+            monitor = cls(wallet_address, on_trade_callback, feed)
+            monitor.running = True
+            monitors[monitor.wallet] = monitor
+        feed.subscribe_many(list(monitors), on_trade_callback)
+        return monitors
     
-    def _connect_websocket(self):
-        """Connect to Polymarket RTDS WebSocket"""
-        self.ws_app = WebSocketApp(
-            self.ws_url,
-            on_open=self._on_open,
-            on_message=self._on_message,
-            on_error=self._on_error,
-            on_close=self._on_close
-        )
-        
-        # Run in separate thread
-        ws_thread = threading.Thread(target=self.ws_app.run_forever)
-        ws_thread.daemon = True
-        ws_thread.start()
\ No newline at end of file
+    def start(self):
+        """Start monitoring"""
+        if self.running:
+            return
+        
+        self.running = True
+        self.feed.subscribe(self.wallet, self.on_trade)
+        
+    def stop(self):
+        """Stop monitoring"""
+        self.running = False
+        self.feed.unsubscribe(self.wallet, self.on_trade)
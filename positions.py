@@ -0,0 +1,162 @@
+from array import array
+
+# Share counts below this are treated as a closed position
+DUST = 1e-6
+
+class PositionBook:
+    """Running per-wallet positions and PnL, updated in O(1) per trade
+    
+    Every (wallet, outcome token) pair gets a slot index into parallel
+    arrays of doubles; per-wallet totals live in a second set of arrays, so
+    /pnl never has to walk a wallet's history.
+    """
+    
+    def __init__(self):
+        # Per position slot
+        self._slots = {}
+        self.shares = array("d")
+        self.avg_price = array("d")
+        self.last_price = array("d")
+        self.realized = array("d")
+        self.volume = array("d")
+        self.labels = []
+        
+        # Per wallet
+        self._wallets = {}
+        self.wallet_slots = []
+        self.wallet_realized = array("d")
+        self.wallet_unrealized = array("d")
+        self.wallet_volume = array("d")
+        self.wallet_trades = array("Q")
+    
+    def _wallet_index(self, wallet):
+        index = self._wallets.get(wallet)
+        if index is None:
+            index = self._wallets[wallet] = len(self.wallet_slots)
+            self.wallet_slots.append(array("I"))
+            self.wallet_realized.append(0.0)
+            self.wallet_unrealized.append(0.0)
+            self.wallet_volume.append(0.0)
+            self.wallet_trades.append(0)
+        return index
+    
+    def _slot(self, wallet, w, trade):
+        token = trade.get("asset") or f"{trade.get('conditionId', '')}:{trade.get('outcome', '')}"
+        slot = self._slots.get((wallet, token))
+        if slot is None:
+            slot = self._slots[(wallet, token)] = len(self.shares)
+            self.shares.append(0.0)
+            self.avg_price.append(0.0)
+            self.last_price.append(0.0)
+            self.realized.append(0.0)
+            self.volume.append(0.0)
+            self.labels.append((trade.get("title", "Unknown Market"), trade.get("outcome", "Unknown"), trade.get("eventSlug", "")))
+            self.wallet_slots[w].append(slot)
+        return slot
+    
+    def apply(self, trade):
+        """
+        Fold one trade into its wallet's position
+        
+        Args:
+            trade: Trade dict from the feed
+        
+        Returns:
+            (shares held, average entry price) after the trade, None if it couldn't be applied
+        """
+        wallet = trade.get("proxyWallet", "").lower()
+        try:
+            price = float(trade.get("price", 0))
+            size = float(trade.get("size", 0))
+        except (TypeError, ValueError):
+            return None
+        if not wallet or size <= 0:
+            return None
+        
+        w = self._wallet_index(wallet)
+        slot = self._slot(wallet, w, trade)
+        shares = self.shares[slot]
+        avg = self.avg_price[slot]
+        before = shares * (self.last_price[slot] - avg)
+        
+        if trade.get("side", "").upper() == "BUY":
+            avg = (shares * avg + size * price) / (shares + size)
+            shares += size
+        else:
+            # Selling more than we saw bought: only the known shares have a basis
+            closed = min(size, shares)
+            pnl = closed * (price - avg)
+            self.realized[slot] += pnl
+            self.wallet_realized[w] += pnl
+            shares -= closed
+            if shares < DUST:
+                shares = 0.0
+                avg = 0.0
+        
+        value = price * size
+        self.shares[slot] = shares
+        self.avg_price[slot] = avg
+        self.last_price[slot] = price
+        self.volume[slot] += value
+        self.wallet_volume[w] += value
+        self.wallet_trades[w] += 1
+        self.wallet_unrealized[w] += shares * (price - avg) - before
+        return shares, avg
+    
+    def holding(self, trade):
+        """(shares, average price) of the position a trade belongs to, or None"""
+        wallet = trade.get("proxyWallet", "").lower()
+        token = trade.get("asset") or f"{trade.get('conditionId', '')}:{trade.get('outcome', '')}"
+        slot = self._slots.get((wallet, token))
+        if slot is None:
+            return None
+        return self.shares[slot], self.avg_price[slot]
+    
+    def positions(self, wallet, open_only=True):
+        """
+        A wallet's positions, largest cost basis first
+        
+        Returns:
+            List of dicts with title, outcome, slug, shares, avg_price, last_price, realized, unrealized, volume
+        """
+        w = self._wallets.get(wallet.lower())
+        if w is None:
+            return []
+        
+        result = []
+        for slot in self.wallet_slots[w]:
+            shares = self.shares[slot]
+            if open_only and shares < DUST:
+                continue
+            title, outcome, slug = self.labels[slot]
+            avg = self.avg_price[slot]
+            result.append({
+                "title": title,
+                "outcome": outcome,
+                "slug": slug,
+                "shares": shares,
+                "avg_price": avg,
+                "last_price": self.last_price[slot],
+                "realized": self.realized[slot],
+                "unrealized": shares * (self.last_price[slot] - avg),
+                "volume": self.volume[slot],
+            })
+        result.sort(key=lambda p: -p["shares"] * p["avg_price"])
+        return result
+    
+    def totals(self, wallet):
+        """
+        Running totals for a wallet
+        
+        Returns:
+            Dict with realized, unrealized (marked at last trade prices), volume and trades, None if unseen
+        """
+        w = self._wallets.get(wallet.lower())
+        if w is None:
+            return None
+        return {
+            "realized": self.wallet_realized[w],
+            "unrealized": self.wallet_unrealized[w],
+            "volume": self.wallet_volume[w],
+            "trades": self.wallet_trades[w],
+        }
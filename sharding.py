@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from polymarket_tracker import PolymarketFeed
+
+logger = logging.getLogger(__name__)
+
+def run_worker(shard_id, inbox, out):
+    """
+    Worker process entry point: match batches of raw frames against every tracked wallet
+    
+    Args:
+        shard_id: This worker's index
+        inbox: Queue of ("frames", (sent_at, [raw frames])), ("subscribe", [wallets]),
+               ("unsubscribe", [wallets]) or ("stop", None)
+        out: Queue carrying ("matched", shard_id, (sent_at, trades, frames decoded)) to the coordinator
+    """
+    from logs import setup_logging
+    setup_logging()
+    # A terminal's Ctrl-C reaches the whole process group; the coordinator
+    # stops workers itself once it has closed the connection
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    # Never connects; only its dispatch index, prefilter and decoder are used
+    matcher = PolymarketFeed()
+    forward = lambda trade: None
+    
+    while True:
+        command, value = inbox.get()
+        if command == "frames":
+            sent_at, frames = value
+            decoded = matcher.frames_decoded
+            trades = []
+            for frame in frames:
+                trades.extend(
+                    trade for trade in matcher.match(frame)
+                    if str(trade.get("proxyWallet", "")).lower() in matcher.subscribers
+                )
+            out.put(("matched", shard_id, (sent_at, trades, matcher.frames_decoded - decoded)))
+        elif command == "subscribe":
+            matcher.subscribe_many(value, forward)
+        elif command == "unsubscribe":
+            for wallet in value:
+                matcher.unsubscribe(wallet)
+        elif command == "stop":
+            return
+
+class ShardedFeed(PolymarketFeed):
+    """PolymarketFeed whose frame matching and decoding run in worker processes
+    
+    The coordinator holds the one firehose connection, the dispatch index,
+    dedup and gap tracking, so callers (on_trade, backfill, /status) use it
+    exactly like a single feed. Raw frames are handed to the workers in
+    batches, round-robin; every worker knows every tracked wallet, so each
+    scans only its share of the frames and sends matched trades back over
+    a multiprocessing queue to be dispatched here.
+    """
+    
+    def __init__(self, workers, ws_url="wss://ws-live-data.polymarket.com", batch_size=256,
+                 supervise_interval=5.0, **kwargs):
+        """
+        Initialize sharded feed
+        
+        Args:
+            workers: Number of worker processes
+            ws_url: Polymarket RTDS WebSocket URL
+            batch_size: Most frames handed to a worker at once
+            supervise_interval: Seconds between checks for dead workers
+            **kwargs: Passed to PolymarketFeed for the connection, dedup and decoding
+        """
+        super().__init__(ws_url, **kwargs)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.supervise_interval = supervise_interval
+        # spawn, not fork: the bot already runs threads and an event loop
+        self._mp = multiprocessing.get_context("spawn")
+        self._out = self._mp.Queue()
+        self._processes = {}
+        self._inboxes = {}
+        # {shard_id: deque of sent_at}, batches handed over but not answered yet
+        self._inflight = {}
+        self._frames = []
+        self._next_shard = 0
+        self._reader = None
+        self._supervisor = None
+        self.restarts = 0
+    
+    def subscribe(self, wallet_address, on_trade_callback):
+        new = wallet_address.lower() not in self.subscribers
+        super().subscribe(wallet_address, on_trade_callback)
+        if new:
+            self._broadcast("subscribe", [wallet_address.lower()])
+    
+    def subscribe_many(self, wallet_addresses, on_trade_callback):
+        new = [w.lower() for w in wallet_addresses if w.lower() not in self.subscribers]
+        super().subscribe_many(wallet_addresses, on_trade_callback)
+        if new:
+            self._broadcast("subscribe", new)
+    
+    def unsubscribe(self, wallet_address, on_trade_callback=None):
+        super().unsubscribe(wallet_address, on_trade_callback)
+        wallet = wallet_address.lower()
+        if wallet not in self.subscribers:
+            self._broadcast("unsubscribe", [wallet])
+    
+    def _broadcast(self, command, wallets):
+        """Forward a subscription change to every worker"""
+        for inbox in self._inboxes.values():
+            inbox.put((command, wallets))
+    
+    def start(self):
+        """Spawn the workers, then open the connection on the running loop"""
+        if self.running:
+            return
+        
+        loop = asyncio.get_running_loop()
+        for shard_id in range(self.workers):
+            self._spawn(shard_id)
+        
+        self._reader = threading.Thread(target=self._read, args=(loop,), name="shard-reader", daemon=True)
+        self._reader.start()
+        self._supervisor = loop.create_task(self._supervise())
+        super().start()
+        logger.info("🧩 Started %d feed workers for %d wallet(s)", self.workers, len(self.subscribers))
+    
+    def stop(self):
+        """Close the connection and stop every worker"""
+        if not self.running:
+            return
+        super().stop()
+        if self._supervisor:
+            self._supervisor.cancel()
+            self._supervisor = None
+        
+        for inbox in self._inboxes.values():
+            inbox.put(("stop", None))
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
+        self._inboxes.clear()
+        self._inflight.clear()
+        self._frames = []
+        self._out.put(None)
+    
+    def _spawn(self, shard_id):
+        """Start (or restart) one worker and hand it every tracked wallet"""
+        inbox = self._mp.Queue()
+        inbox.put(("subscribe", list(self.subscribers)))
+        process = self._mp.Process(
+            target=run_worker,
+            args=(shard_id, inbox, self._out),
+            name=f"feed-shard-{shard_id}",
+            daemon=True,
+        )
+        process.start()
+        self._inboxes[shard_id] = inbox
+        self._processes[shard_id] = process
+        self._inflight[shard_id] = deque()
+    
+    def _on_message(self, message):
+        """Queue a raw frame for the next worker instead of matching it here"""
+        self.frames_received += 1
+        self.last_message_at = time.time()
+        
+        frames = self._frames
+        frames.append(message)
+        if len(frames) == 1:
+            # Runs once the frames already received have been read, so a
+            # burst goes out as one batch and a lone trade isn't held back
+            asyncio.get_running_loop().call_soon(self._hand_off)
+        elif len(frames) >= self.batch_size:
+            self._hand_off()
+    
+    def _hand_off(self):
+        """Send the pending frames to the next worker"""
+        frames, self._frames = self._frames, []
+        if not frames or not self._inboxes:
+            return
+        shard_id = self._next_shard
+        self._next_shard = (shard_id + 1) % self.workers
+        sent_at = time.time()
+        self._inflight[shard_id].append(sent_at)
+        self._inboxes[shard_id].put(("frames", (sent_at, frames)))
+    
+    async def _supervise(self):
+        """Restart workers that died, backfilling the frames they never matched"""
+        while self.running:
+            await asyncio.sleep(self.supervise_interval)
+            for shard_id, process in list(self._processes.items()):
+                if process.is_alive() or not self.running:
+                    continue
+                logger.warning("⚠️ Feed worker %d exited (code %s), restarting...", shard_id, process.exitcode)
+                self.restarts += 1
+                lost = self._inflight.get(shard_id)
+                self._spawn(shard_id)
+                if lost and self.on_connected is not None:
+                    # A gap like a reconnect's, from the oldest unanswered batch
+                    self.on_connected(lost[0])
+    
+    def _read(self, loop):
+        """Move worker messages onto the event loop in batches (runs in a thread)"""
+        while True:
+            message = self._out.get()
+            if message is None:
+                return
+            batch = [message]
+            while len(batch) < 256:
+                try:
+                    message = self._out.get_nowait()
+                except queue.Empty:
+                    break
+                if message is None:
+                    loop.call_soon_threadsafe(self._on_worker_messages, batch)
+                    return
+                batch.append(message)
+            loop.call_soon_threadsafe(self._on_worker_messages, batch)
+    
+    def _on_worker_messages(self, batch):
+        """Dispatch trades the workers matched"""
+        trades = []
+        for kind, shard_id, (sent_at, matched, decoded) in batch:
+            inflight = self._inflight.get(shard_id)
+            if inflight and inflight[0] == sent_at:
+                inflight.popleft()
+            self.frames_decoded += decoded
+            trades.extend(matched)
+        
+        if trades:
+            self._dispatch(trades)
@@ -0,0 +1,132 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def open_database(path):
+    """Connection to a SQLite file in WAL mode, shareable with a writer thread"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def primary_key(conn, table):
+    """Names of a table's primary key columns in key order, empty if it doesn't exist"""
+    columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return [column[1] for column in sorted(columns, key=lambda c: c[5]) if column[5]]
+
+def rebuild_table(conn, table, schema):
+    """
+    Recreate a table from a new CREATE TABLE statement, keeping its rows
+    
+    Args:
+        conn: Open connection
+        table: Table to rebuild; its indexes are dropped and must be recreated
+        schema: CREATE TABLE statement with the same columns in the same order
+    """
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        conn.execute(schema)
+        conn.execute(f"INSERT OR IGNORE INTO {table} SELECT * FROM {table}_old")
+        conn.execute(f"DROP TABLE {table}_old")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+class BatchWriter:
+    """Background thread committing queued items to SQLite in batches
+    
+    Callers only put items on an in-memory queue, so they never wait on
+    disk; the thread groups whatever arrives within flush_interval (up to
+    batch_size) and hands it to `apply` as one batch.
+    """
+    
+    def __init__(self, name, apply, prune=None, batch_size=500, flush_interval=0.5, prune_interval=3600):
+        """
+        Initialize writer
+        
+        Args:
+            name: Thread name, also used in log messages
+            apply: Function taking (conn, list of items) that writes one batch
+            prune: Optional function taking conn, called every prune_interval seconds
+            batch_size: Most items passed to apply at once
+            flush_interval: Seconds a queued item may wait for its batch
+            prune_interval: Seconds between prune calls
+        """
+        self.name = name
+        self.apply = apply
+        self.prune = prune
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        
+        self._queue = queue.Queue()
+        self._thread = None
+        self._last_prune = 0.0
+    
+    @property
+    def running(self):
+        return self._thread is not None
+    
+    def start(self, conn):
+        """Start writing to conn, which the thread closes when stopped"""
+        self._thread = threading.Thread(target=self._run, args=(conn,), name=self.name, daemon=True)
+        self._thread.start()
+    
+    def put(self, item):
+        self._queue.put(item)
+    
+    def pending(self):
+        """Items queued but not yet committed"""
+        return self._queue.qsize()
+    
+    def close(self, timeout=10):
+        """Commit everything queued and stop the thread"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout=timeout)
+    
+    def _run(self, conn):
+        """Drain queued items into batched transactions"""
+        running = True
+        while running:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+            
+            deadline = time.monotonic() + self.flush_interval
+            while item is not False:
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            
+            if batch:
+                try:
+                    self.apply(conn, batch)
+                except Exception as e:
+                    logger.error("❌ %s write failed, %d item(s) lost: %s", self.name, len(batch), e)
+            
+            if self.prune is not None and time.time() - self._last_prune > self.prune_interval:
+                self._last_prune = time.time()
+                try:
+                    self.prune(conn)
+                except Exception as e:
+                    logger.warning("⚠️ %s prune failed: %s", self.name, e)
+        
+        conn.close()
@@ -0,0 +1,46 @@
+import logging
+import os
+import time
+from metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+STARTUP_SECONDS = Gauge("polytracker_startup_seconds", "Seconds from process start to each startup stage", labels=("stage",))
+
+def process_age():
+    """Seconds since this process was started, 0 where /proc isn't available"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22, counted after the parenthesised command name
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+class StartupProfile:
+    """Time from process start to each startup stage, recorded once per stage
+    
+    Stages are named by the caller (imports, webhook, feed live, ...);
+    the clock starts when the process did, so interpreter startup and
+    module imports are included.
+    """
+    
+    def __init__(self):
+        self.started = time.monotonic() - process_age()
+        # {stage: seconds since process start}, in the order reached
+        self.stages = {}
+    
+    def mark(self, stage):
+        """Record a stage the first time it is reached, returning whether this was it"""
+        if stage in self.stages:
+            return False
+        elapsed = self.stages[stage] = time.monotonic() - self.started
+        STARTUP_SECONDS.set(elapsed, stage)
+        logger.debug("⏱️ Startup stage %s after %.2fs", stage, elapsed)
+        return True
+    
+    def report(self):
+        """One-line summary of the stages reached so far"""
+        return " · ".join(f"{stage} {elapsed:.2f}s" for stage, elapsed in self.stages.items())
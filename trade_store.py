@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from alerts import trade_timestamp, trade_value
+from sqlite_writer import BatchWriter, open_database, primary_key, rebuild_table
+
+logger = logging.getLogger(__name__)
+
+# Keyed by wallet too, as several tracked wallets can fill in one transaction
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS trades (
+        trade_id TEXT NOT NULL,
+        wallet TEXT NOT NULL,
+        condition_id TEXT NOT NULL,
+        event_slug TEXT NOT NULL,
+        title TEXT NOT NULL,
+        outcome TEXT NOT NULL,
+        side TEXT NOT NULL,
+        price REAL NOT NULL,
+        size REAL NOT NULL,
+        value REAL NOT NULL,
+        ts REAL NOT NULL,
+        PRIMARY KEY (trade_id, wallet)
+    )
+"""
+
+COLUMNS = ("trade_id", "wallet", "condition_id", "event_slug", "title", "outcome", "side", "price", "size", "value", "ts")
+
+class TradeStore:
+    """Queryable history of every trade from a tracked wallet
+    
+    One typed row per trade in SQLite, indexed by wallet, market and time,
+    so /history, /top and /volume are index range scans. Like the journal,
+    writes are queued and committed in batches by a background thread;
+    queries use their own connection and run off the event loop.
+    """
+    
+    def __init__(self, path, batch_size=1000, flush_interval=1.0, retention=90 * 86400):
+        """
+        Initialize store
+        
+        Args:
+            path: SQLite database file (e.g. /data/trades.db)
+            batch_size: Most trades committed in one transaction
+            flush_interval: Seconds a queued trade may wait for its batch
+            retention: Seconds trades are kept before being pruned
+        """
+        self.path = path
+        self.retention = retention
+        
+        self._writer = BatchWriter("trade-store", self._apply, self._prune, batch_size, flush_interval)
+        self._reader = None
+        self._read_lock = threading.Lock()
+        self.written = 0
+    
+    def _connect(self):
+        """Open the database and create the schema if needed"""
+        conn = open_database(self.path)
+        if primary_key(conn, "trades") == ["trade_id"]:
+            rebuild_table(conn, "trades", SCHEMA)
+        conn.execute(SCHEMA)
+        # Every query filters on one of these and a time range; value and
+        # side ride along in the wallet index so /volume never reads rows
+        conn.execute("CREATE INDEX IF NOT EXISTS trades_wallet ON trades (wallet, ts, value, side)")
+        conn.execute("CREATE INDEX IF NOT EXISTS trades_condition ON trades (condition_id, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS trades_event ON trades (event_slug, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts)")
+        conn.commit()
+        return conn
+    
+    def open(self):
+        """Create the schema and start the writer thread"""
+        conn = self._connect()
+        self._reader = open_database(self.path)
+        self._writer.start(conn)
+        logger.info("🗄️ Trade history store opened at %s", self.path)
+    
+    def add(self, trade):
+        """Queue a trade for storage; duplicates are ignored when written"""
+        if not self._writer.running:
+            return
+        self._writer.put((trade, time.time()))
+    
+    def close(self):
+        """Commit everything queued and stop the writer"""
+        if not self._writer.running:
+            return
+        self._writer.close()
+        with self._read_lock:
+            self._reader.close()
+            self._reader = None
+    
+    def newest(self):
+        """Timestamp of the newest stored trade, 0 when the store is empty or not open"""
+        rows = self._query("SELECT MAX(ts) AS ts FROM trades", ())
+        return (rows[0]["ts"] or 0) if rows else 0
+    
+    def pending(self):
+        """Trades queued but not yet committed"""
+        return self._writer.pending()
+    
+    def _query(self, sql, params):
+        """Run a read query and return its rows as dicts"""
+        with self._read_lock:
+            if self._reader is None:
+                return []
+            cursor = self._reader.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+    
+    def history(self, wallet=None, market=None, limit=10):
+        """
+        Most recent trades of a wallet or in a market
+        
+        Args:
+            wallet: Wallet address
+            market: Condition ID or event slug, used when no wallet is given
+            limit: Most trades returned
+        
+        Returns:
+            List of trade row dicts, newest first
+        """
+        if wallet:
+            where, params = "wallet = ?", (wallet.lower(),)
+        elif market.startswith("0x"):
+            where, params = "condition_id = ?", (market.lower(),)
+        else:
+            where, params = "event_slug = ?", (market.lower(),)
+        return self._query(f"SELECT * FROM trades WHERE {where} ORDER BY ts DESC LIMIT ?", params + (limit,))
+    
+    def top(self, wallets, since, limit=10):
+        """
+        Largest trades by the given wallets since a time
+        
+        Returns:
+            List of trade row dicts, largest value first
+        """
+        wallets = list(wallets)
+        if not wallets:
+            return []
+        marks = ",".join("?" * len(wallets))
+        return self._query(
+            f"SELECT * FROM trades WHERE wallet IN ({marks}) AND ts >= ? ORDER BY value DESC LIMIT ?",
+            (*wallets, since, limit),
+        )
+    
+    def volume(self, wallets, since):
+        """
+        Per-wallet trade counts and volume since a time
+        
+        Returns:
+            List of dicts with wallet, trades, volume, bought and sold, largest volume first
+        """
+        wallets = list(wallets)
+        if not wallets:
+            return []
+        marks = ",".join("?" * len(wallets))
+        return self._query(
+            f"""SELECT wallet, COUNT(*) AS trades, SUM(value) AS volume,
+                       SUM(CASE WHEN side = 'BUY' THEN value ELSE 0 END) AS bought,
+                       SUM(CASE WHEN side = 'BUY' THEN 0 ELSE value END) AS sold
+                FROM trades WHERE wallet IN ({marks}) AND ts >= ?
+                GROUP BY wallet ORDER BY volume DESC""",
+            (*wallets, since),
+        )
+    
+    def _apply(self, conn, batch):
+        """Write one batch in a single transaction"""
+        rows = []
+        for trade, received_at in batch:
+            row = self._row(trade, received_at)
+            if row is not None:
+                rows.append(row)
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO trades ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+        self.written += len(rows)
+    
+    @staticmethod
+    def _row(trade, received_at):
+        """Column values for a trade, None if it has no ID or malformed numbers"""
+        trade_id = trade.get("transactionHash") or trade.get("id")
+        if not trade_id:
+            return None
+        try:
+            price = float(trade.get("price", 0))
+            size = float(trade.get("size", 0))
+            value = trade_value(trade)
+        except (TypeError, ValueError):
+            return None
+        ts = trade_timestamp(trade) or received_at
+        return (
+            trade_id,
+            trade.get("proxyWallet", "").lower(),
+            str(trade.get("conditionId", "")).lower(),
+            str(trade.get("eventSlug", "")).lower(),
+            trade.get("title", "Unknown Market"),
+            trade.get("outcome", "Unknown"),
+            trade.get("side", "").upper(),
+            price,
+            size,
+            value,
+            ts,
+        )
+    
+    def _prune(self, conn):
+        """Drop trades older than the retention period"""
+        with conn:
+            conn.execute("DELETE FROM trades WHERE ts < ?", (time.time() - self.retention,))
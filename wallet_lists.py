@@ -0,0 +1,55 @@
+import csv
+import io
+import re
+
+ADDRESS = re.compile(r"0x[0-9a-fA-F]{40}")
+
+def parse_wallet_list(text, max_wallets=5000):
+    """
+    Read wallet/name pairs from pasted text or an uploaded file
+    
+    Accepts one wallet per line in any order ("0x... name", "name 0x...",
+    CSV from /export); lines without an address (headers, blanks) are skipped.
+    
+    Args:
+        text: File or message contents
+        max_wallets: Most wallets read, the rest are ignored
+    
+    Returns:
+        (list of (wallet, name or None) in first-seen order, number of skipped non-empty lines)
+    """
+    entries = {}
+    skipped = 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = ADDRESS.search(line)
+        if match is None:
+            if line.strip().lower() != "address,name":
+                skipped += 1
+            continue
+        wallet = match.group(0).lower()
+        name = (line[:match.start()] + " " + line[match.end():]).strip(" \t,;:|\"'")
+        if wallet not in entries:
+            if len(entries) >= max_wallets:
+                skipped += 1
+                continue
+            entries[wallet] = name or None
+        elif name:
+            entries[wallet] = name
+    return list(entries.items()), skipped
+
+def format_wallet_list(wallets, name_lookup):
+    """
+    CSV of wallets and their names, readable by parse_wallet_list
+    
+    Args:
+        wallets: Wallet addresses in display order
+        name_lookup: Function mapping a wallet address to its display name or None
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(("address", "name"))
+    for wallet in wallets:
+        writer.writerow((wallet, name_lookup(wallet) or ""))
+    return out.getvalue()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class WebServer:
+    """Small HTTP/1.1 server for the Telegram webhook and /metrics on one port
+    
+    Handlers are async functions taking the request body and returning
+    (status, content type, body bytes).
+    """
+    
+    def __init__(self, host="0.0.0.0", port=8080, max_body=1 << 20, header_timeout=30.0):
+        """
+        Initialize server
+        
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            max_body: Largest request body accepted, in bytes
+            header_timeout: Seconds an idle keep-alive connection is held
+        """
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.header_timeout = header_timeout
+        self.routes = {}
+        self._server = None
+    
+    def route(self, method, path, handler):
+        """Register a handler for a method and exact path"""
+        self.routes[(method, path)] = handler
+    
+    async def start(self):
+        """Start listening"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+    
+    async def stop(self):
+        """Stop listening and wait for the socket to close"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader, writer):
+        """Serve requests on one connection until it closes"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.header_timeout)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                    return
+                
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, "text/plain", b"", False)
+                    return
+                
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await self._respond(writer, 411, "text/plain", b"", False)
+                    return
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, "text/plain", b"", False)
+                    return
+                if length > self.max_body:
+                    await self._respond(writer, 413, "text/plain", b"", False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                
+                path = target.split("?", 1)[0]
+                handler = self.routes.get((method, path))
+                if handler is None:
+                    known = any(route_path == path for _, route_path in self.routes)
+                    status, content_type, payload = (405 if known else 404), "text/plain", b""
+                else:
+                    try:
+                        status, content_type, payload = await handler(body)
+                    except Exception as e:
+                        logger.exception("⚠️ HTTP %s handler failed: %s", method, e)
+                        status, content_type, payload = 500, "text/plain", b""
+                
+                await self._respond(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _respond(self, writer, status, content_type, payload, keep_alive):
+        """Write one response"""
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()